@@ -0,0 +1,181 @@
+"""initial schema
+
+Revision ID: 9f0b6e1d2c84
+Revises:
+Create Date: 2026-10-19 09:00:00.000000
+
+The tables as they were before any revision was kept in the repo. A
+database created from the models back then already has them: mark it
+with ``alembic stamp 9f0b6e1d2c84`` and upgrade from there.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f0b6e1d2c84'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "users",
+        sa.Column('full_name', sa.String(length=255), nullable=False),
+        sa.Column('password', sa.String(length=128), nullable=False),
+        sa.Column('phone', sa.String(length=20), nullable=True),
+        sa.Column('email', sa.String(length=100), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('role', sa.Enum('ADMIN', 'STAFF', 'MANAGER', 'CUSTOMER', 'PROVIDER', name='baseuserrole'), nullable=False),
+        sa.Column('store_name', sa.String(length=100), nullable=True),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('uuid', sa.UUID(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('modified_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_users')),
+        sa.UniqueConstraint('full_name', name=op.f('uq_users_full_name')),
+        sa.UniqueConstraint('uuid', name=op.f('uq_users_uuid')),
+    )
+    op.create_table(
+        "carts",
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('uuid', sa.UUID(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('modified_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk_carts_user_id_users')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_carts')),
+        sa.UniqueConstraint('user_id', name=op.f('uq_carts_user_id')),
+        sa.UniqueConstraint('uuid', name=op.f('uq_carts_uuid')),
+    )
+    op.create_table(
+        "products",
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('price', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('discount', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('free_shipping', sa.Boolean(), nullable=False),
+        sa.Column('description', sa.String(length=800), nullable=False),
+        sa.Column('specs', postgresql.ARRAY(sa.String()), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('uuid', sa.UUID(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('modified_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk_products_user_id_users')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_products')),
+        sa.UniqueConstraint('title', name=op.f('uq_products_title')),
+        sa.UniqueConstraint('uuid', name=op.f('uq_products_uuid')),
+    )
+    op.create_table(
+        "sells",
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('paid', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('uuid', sa.UUID(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('modified_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk_sells_user_id_users')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_sells')),
+        sa.UniqueConstraint('uuid', name=op.f('uq_sells_uuid')),
+    )
+    op.create_table(
+        "cart_items",
+        sa.Column('cart_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('qty', sa.Integer(), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('uuid', sa.UUID(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('modified_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['cart_id'], ['carts.id'], name=op.f('fk_cart_items_cart_id_carts')),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], name=op.f('fk_cart_items_product_id_products')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_cart_items')),
+        sa.UniqueConstraint('uuid', name=op.f('uq_cart_items_uuid')),
+    )
+    op.create_table(
+        "detail_sells",
+        sa.Column('sell_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('qty', sa.Integer(), nullable=False),
+        sa.Column('price_unit', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('uuid', sa.UUID(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('modified_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], name=op.f('fk_detail_sells_product_id_products')),
+        sa.ForeignKeyConstraint(['sell_id'], ['sells.id'], name=op.f('fk_detail_sells_sell_id_sells')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_detail_sells')),
+        sa.UniqueConstraint('uuid', name=op.f('uq_detail_sells_uuid')),
+    )
+    op.create_table(
+        "favorites",
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('uuid', sa.UUID(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('modified_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], name=op.f('fk_favorites_product_id_products')),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk_favorites_user_id_users')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_favorites')),
+        sa.UniqueConstraint('uuid', name=op.f('uq_favorites_uuid')),
+    )
+    op.create_table(
+        "product_images",
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('path', sa.String(length=300), nullable=False),
+        sa.Column('is_primary', sa.Boolean(), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('uuid', sa.UUID(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('modified_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], name=op.f('fk_product_images_product_id_products'), ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_product_images')),
+        sa.UniqueConstraint('uuid', name=op.f('uq_product_images_uuid')),
+    )
+    op.create_table(
+        "reviews",
+        sa.Column('rating', sa.Integer(), nullable=False),
+        sa.Column('comment', sa.String(length=600), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('uuid', sa.UUID(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('modified_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], name=op.f('fk_reviews_product_id_products')),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk_reviews_user_id_users')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_reviews')),
+        sa.UniqueConstraint('uuid', name=op.f('uq_reviews_uuid')),
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index('uq_store_name_not_null', 'users', ['store_name'], unique=True, postgresql_where=sa.text('store_name IS NOT NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("reviews")
+    op.drop_table("product_images")
+    op.drop_table("favorites")
+    op.drop_table("detail_sells")
+    op.drop_table("cart_items")
+    op.drop_table("sells")
+    op.drop_table("products")
+    op.drop_table("carts")
+    op.drop_table("users")
+    sa.Enum(name="baseuserrole").drop(op.get_bind(), checkfirst=True)
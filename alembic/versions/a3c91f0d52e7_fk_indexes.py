@@ -0,0 +1,55 @@
+"""index foreign keys
+
+Revision ID: a3c91f0d52e7
+Revises: 9f0b6e1d2c84
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c91f0d52e7'
+down_revision: Union[str, Sequence[str], None] = '9f0b6e1d2c84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+FK_INDEXES = [
+    ("products", "user_id"),
+    ("product_images", "product_id"),
+    ("reviews", "product_id"),
+    ("reviews", "user_id"),
+    ("detail_sells", "sell_id"),
+    ("detail_sells", "product_id"),
+    ("sells", "user_id"),
+    ("favorites", "user_id"),
+    ("favorites", "product_id"),
+    ("cart_items", "cart_id"),
+    ("cart_items", "product_id"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for table, column in FK_INDEXES:
+            op.create_index(
+                f"ix_{table}_{column}", table, [column],
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table, column in reversed(FK_INDEXES):
+            op.drop_index(
+                f"ix_{table}_{column}", table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
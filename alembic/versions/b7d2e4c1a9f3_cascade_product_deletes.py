@@ -0,0 +1,54 @@
+"""cascade product deletes in the database
+
+Revision ID: b7d2e4c1a9f3
+Revises: a3c91f0d52e7
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e4c1a9f3'
+down_revision: Union[str, Sequence[str], None] = 'a3c91f0d52e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+CASCADED = ["reviews", "favorites", "cart_items"]
+
+
+def _constraint(table: str) -> str:
+    return f"fk_{table}_product_id_products"
+
+
+def _replace_fks(on_delete: str) -> None:
+    # Swap each constraint in one ALTER, so the table is never
+    # unprotected. NOT VALID makes the ALTER skip the scan; it still
+    # takes an ACCESS EXCLUSIVE lock, held until the transaction commits.
+    for table in CASCADED:
+        name = _constraint(table)
+        op.execute(
+            f"ALTER TABLE {table} "
+            f"DROP CONSTRAINT IF EXISTS {name}, "
+            f"ADD CONSTRAINT {name} FOREIGN KEY (product_id) "
+            f"REFERENCES products (id) {on_delete} NOT VALID"
+        )
+    # autocommit_block commits the ALTERs first, so the validation scans
+    # run afterwards, each on its own, under SHARE UPDATE EXCLUSIVE, which
+    # lets reads and writes through.
+    with op.get_context().autocommit_block():
+        for table in CASCADED:
+            op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {_constraint(table)}")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _replace_fks("ON DELETE CASCADE")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _replace_fks("")
@@ -0,0 +1,37 @@
+"""index products by modified_at for the changes feed
+
+Revision ID: c41e8a6f3b20
+Revises: b7d2e4c1a9f3
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e8a6f3b20'
+down_revision: Union[str, Sequence[str], None] = 'b7d2e4c1a9f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_products_modified_at_id", "products", ["modified_at", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_products_modified_at_id", table_name="products",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
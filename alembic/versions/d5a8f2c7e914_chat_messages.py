@@ -0,0 +1,60 @@
+"""chat message history
+
+Revision ID: d5a8f2c7e914
+Revises: c41e8a6f3b20
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a8f2c7e914'
+down_revision: Union[str, Sequence[str], None] = 'c41e8a6f3b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "chat_messages",
+        sa.Column("room", sa.String(length=120), nullable=False),
+        sa.Column("user_uuid", sa.UUID(), nullable=True),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("uuid", sa.UUID(), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True),
+            server_default=sa.text("now()"), nullable=False,
+        ),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column(
+            "modified_at", sa.DateTime(timezone=True),
+            server_default=sa.text("now()"), nullable=False,
+        ),
+        sa.ForeignKeyConstraint(
+            ["user_uuid"], ["users.uuid"],
+            name=op.f("fk_chat_messages_user_uuid_users"),
+            ondelete="SET NULL",
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_chat_messages")),
+        sa.UniqueConstraint("uuid", name=op.f("uq_chat_messages_uuid")),
+    )
+    # Room history, which skips deleted messages
+    op.create_index(
+        "ix_chat_messages_room_created_at_id_live", "chat_messages",
+        ["room", "created_at", "id"],
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+    op.create_index(
+        op.f("ix_chat_messages_user_uuid"), "chat_messages", ["user_uuid"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("chat_messages")
@@ -0,0 +1,48 @@
+"""tombstones of hard-deleted products
+
+Revision ID: e2b7c9a41f06
+Revises: d5a8f2c7e914
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7c9a41f06'
+down_revision: Union[str, Sequence[str], None] = 'd5a8f2c7e914'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "product_tombstones",
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("uuid", sa.UUID(), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True),
+            server_default=sa.text("now()"), nullable=False,
+        ),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column(
+            "modified_at", sa.DateTime(timezone=True),
+            server_default=sa.text("now()"), nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_product_tombstones")),
+        sa.UniqueConstraint("uuid", name=op.f("uq_product_tombstones_uuid")),
+    )
+    op.create_index(
+        "ix_product_tombstones_created_at_product_id", "product_tombstones",
+        ["created_at", "product_id"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("product_tombstones")
@@ -1,5 +1,6 @@
 import os
 import sys
+import socket
 from typing import cast
 from pathlib import Path
 from dotenv import load_dotenv
@@ -8,12 +9,25 @@ load_dotenv()
 
 APP_NAME = os.getenv("APP_NAME", "")
 APP_VERSION = cast(int, os.getenv("APP_VERSION"))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 PROJECT_URL = os.getenv("PROJECT_URL", "") or ""
 PROJECT_DIR = Path(__file__).parent.parent.parent
 SECRETS_DIR = PROJECT_DIR / "secrets"
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 
+# Server started by ``python main.py`` (see docker-entrypoint.sh)
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", 8000))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", 1))
+
+# /metrics across workers: each worker writes a snapshot of its metrics
+# to METRICS_DIR every METRICS_SYNC_SECONDS and a scrape sums them all.
+# Empty keeps metrics per process; main.py picks a temporary directory
+# itself when SERVER_WORKERS > 1.
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_SYNC_SECONDS = float(os.getenv("METRICS_SYNC_SECONDS", 1))
+
 # DB secrets
 DB_URL = os.getenv("DB_URL")
 DB_NAME = os.getenv("DB_NAME")
@@ -21,6 +35,14 @@ DB_HOST = os.getenv("DB_HOST")
 DB_USERNAME = os.getenv("DB_USERNAME")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 
+# Log statements slower than this many milliseconds (0 disables it)
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", 0))
+# Warn when one request issues more statements than this (0 disables it)
+DB_N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", 0))
+
+# How long BaseCRUD.cached_count serves a count before refreshing it
+COUNT_CACHE_SECONDS = float(os.getenv("COUNT_CACHE_SECONDS", 60))
+
 DB_SYNC_URL = ("postgresql+psycopg2://"
                f"{DB_USERNAME}:{DB_PASSWORD}"
                "@"
@@ -64,6 +86,91 @@ PUBLIC_KEY = load_key(PUBLIC_KEY_PATH, "Public key")
 
 BROKER_URL = os.getenv("BROKER_URL")
 BROKER_MAX_CONNECTIONS = int(os.getenv("BROKER_MAX_CONNECTIONS", 1))
+# Pub/sub connections channels are spread over, and whether to use
+# Redis 7 sharded pub/sub (SSUBSCRIBE/SPUBLISH, no pattern subscriptions)
+BROKER_PUBSUB_SHARDS = int(os.getenv("BROKER_PUBSUB_SHARDS", 1))
+BROKER_SHARDED_PUBSUB = os.getenv("BROKER_SHARDED_PUBSUB", "false").lower() in ("1", "true", "yes")
+
+# Per-subscriber queue bound and what to do when a subscriber falls
+# behind: drop_oldest | drop_newest | disconnect
+BROADCAST_QUEUE_SIZE = int(os.getenv("BROADCAST_QUEUE_SIZE", 256))
+BROADCAST_OVERFLOW_POLICY = os.getenv("BROADCAST_OVERFLOW_POLICY", "drop_oldest")
+
+# Websocket frame batching: pending events are coalesced into one frame
+# for up to WS_BATCH_WINDOW_MS, WS_BATCH_MAX_EVENTS or WS_BATCH_MAX_BYTES.
+# WS_BATCH_MAX_EVENTS=1 sends one frame per event.
+WS_BATCH_WINDOW_MS = float(os.getenv("WS_BATCH_WINDOW_MS", 5))
+WS_BATCH_MAX_EVENTS = int(os.getenv("WS_BATCH_MAX_EVENTS", 64))
+WS_BATCH_MAX_BYTES = int(os.getenv("WS_BATCH_MAX_BYTES", 64 * 1024))
+
+# Websocket authentication: none | db (user loaded on connect) |
+# jwt (token claims only, no database access). At most
+# WS_AUTH_CONCURRENCY sockets authenticate at once; the rest wait up to
+# WS_AUTH_ADMISSION_TIMEOUT seconds and are then closed with 1013.
+WS_AUTH_MODE = os.getenv("WS_AUTH_MODE", "none")
+WS_AUTH_CONCURRENCY = int(os.getenv("WS_AUTH_CONCURRENCY", 32))
+WS_AUTH_ADMISSION_TIMEOUT = float(os.getenv("WS_AUTH_ADMISSION_TIMEOUT", 5))
+
+# Websocket liveness: the app sends a {"type": "ping"} frame every
+# WS_HEARTBEAT_SECONDS (0 disables). Dead peers are dropped by uvicorn's
+# protocol-level pings (WS_PING_*), whose pongs the app never sees. With
+# WS_REQUIRE_APP_PONG the app also closes sockets that sent no frame
+# (e.g. {"type": "pong"}) for WS_IDLE_TIMEOUT_SECONDS; only enable it
+# when every client answers the app pings. On shutdown open sockets are
+# closed with a reconnect hint spread over WS_DRAIN_WINDOW_SECONDS.
+WS_HEARTBEAT_SECONDS = float(os.getenv("WS_HEARTBEAT_SECONDS", 25))
+WS_REQUIRE_APP_PONG = os.getenv("WS_REQUIRE_APP_PONG", "false").lower() in ("1", "true", "yes")
+WS_IDLE_TIMEOUT_SECONDS = float(os.getenv("WS_IDLE_TIMEOUT_SECONDS", 75))
+WS_DRAIN_WINDOW_SECONDS = float(os.getenv("WS_DRAIN_WINDOW_SECONDS", 30))
+WS_PING_INTERVAL = float(os.getenv("WS_PING_INTERVAL", 20))
+WS_PING_TIMEOUT = float(os.getenv("WS_PING_TIMEOUT", 20))
+
+# Compression: uvicorn's permessage-deflate applies to every frame;
+# the chat.msgpack subprotocol instead deflates only frames larger
+# than WS_COMPRESS_THRESHOLD bytes (0 never). Use one or the other:
+# the threshold defaults to 0 while permessage-deflate is on, and
+# setting both is refused at startup.
+WS_PER_MESSAGE_DEFLATE = os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() in ("1", "true", "yes")
+WS_COMPRESS_THRESHOLD = int(os.getenv(
+    "WS_COMPRESS_THRESHOLD", 0 if WS_PER_MESSAGE_DEFLATE else 1024
+))
+
+# Chat flood control: token buckets per socket (in the worker) and per
+# user (in Redis, shared by all workers and nodes; rate 0 disables), a
+# size limit in bytes per inbound frame, and what to do with excess
+# traffic: drop | disconnect
+WS_RATE_PER_SECOND = float(os.getenv("WS_RATE_PER_SECOND", 5))
+WS_RATE_BURST = float(os.getenv("WS_RATE_BURST", 10))
+WS_USER_RATE_PER_SECOND = float(os.getenv("WS_USER_RATE_PER_SECOND", 10))
+WS_USER_RATE_BURST = float(os.getenv("WS_USER_RATE_BURST", 20))
+WS_MAX_PAYLOAD = int(os.getenv("WS_MAX_PAYLOAD", 4096))
+WS_FLOOD_POLICY = os.getenv("WS_FLOOD_POLICY", "drop")
+
+# Chat history: messages are buffered and inserted in batches of
+# CHAT_HISTORY_BATCH_SIZE or every CHAT_HISTORY_FLUSH_MS. Past
+# CHAT_HISTORY_MAX_PENDING buffered messages new ones are not stored.
+CHAT_HISTORY_ENABLED = os.getenv("CHAT_HISTORY_ENABLED", "true").lower() in ("1", "true", "yes")
+CHAT_HISTORY_BATCH_SIZE = int(os.getenv("CHAT_HISTORY_BATCH_SIZE", 500))
+CHAT_HISTORY_FLUSH_MS = float(os.getenv("CHAT_HISTORY_FLUSH_MS", 1000))
+CHAT_HISTORY_MAX_PENDING = int(os.getenv("CHAT_HISTORY_MAX_PENDING", 50000))
+
+# Presence: nodes flush their connection counts to Redis every
+# PRESENCE_FLUSH_SECONDS; entries expire after PRESENCE_TTL_SECONDS.
+# The pid is always appended: each worker process is a node of its own.
+NODE_ID = f"{os.getenv('NODE_ID') or socket.gethostname()}:{os.getpid()}"
+PRESENCE_FLUSH_SECONDS = float(os.getenv("PRESENCE_FLUSH_SECONDS", 10))
+PRESENCE_TTL_SECONDS = int(os.getenv("PRESENCE_TTL_SECONDS", 30))
+PRESENCE_QUERY_MAX = int(os.getenv("PRESENCE_QUERY_MAX", 1000))
+
+# Redis Streams broadcast backend (BROKER_URL=redis+streams://...):
+# streams are capped at about BROKER_STREAM_MAXLEN entries, and a
+# reconnecting client replays at most WS_REPLAY_MAX missed events.
+BROKER_STREAM_MAXLEN = int(os.getenv("BROKER_STREAM_MAXLEN", 10000))
+# Streams expire this long after their last message
+BROKER_STREAM_TTL_SECONDS = int(os.getenv("BROKER_STREAM_TTL_SECONDS", 24 * 3600))
+BROKER_STREAM_BLOCK_MS = int(os.getenv("BROKER_STREAM_BLOCK_MS", 1000))
+BROKER_STREAM_BATCH = int(os.getenv("BROKER_STREAM_BATCH", 100))
+WS_REPLAY_MAX = int(os.getenv("WS_REPLAY_MAX", 1000))
 
 # Redis
 REDIS_HOST = os.getenv("REDIS_HOST")
@@ -75,4 +182,55 @@ MEDIA_DIR = PROJECT_DIR / "media"
 MEDIA_DIR.mkdir(parents=True, exist_ok=True)
 
 MEDIA_PRODUCTS = MEDIA_DIR / "products"
-MEDIA_PRODUCTS.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
+MEDIA_PRODUCTS.mkdir(parents=True, exist_ok=True)
+
+# Max product uuids accepted by the batch lookup/delete endpoints
+PRODUCT_BATCH_MAX_SIZE = int(os.getenv("PRODUCT_BATCH_MAX_SIZE", 500))
+
+# Products modified more recently than this are held back from the
+# changes feed until concurrent transactions are sure to have committed
+PRODUCT_CHANGES_LAG_SECONDS = float(
+    os.getenv("PRODUCT_CHANGES_LAG_SECONDS", 2)
+)
+# ...but a transaction open for longer than this no longer holds it
+# back. The app's connections abort transactions left idle for half of
+# it; other writers need a statement/idle timeout below it as well, or a
+# late commit can be skipped.
+PRODUCT_CHANGES_MAX_HOLD_SECONDS = float(
+    os.getenv("PRODUCT_CHANGES_MAX_HOLD_SECONDS", 60)
+)
+
+# Tombstones of hard-deleted products are pruned after this many days,
+# checked every PRODUCT_TOMBSTONE_PRUNE_SECONDS. A changes-feed cursor
+# older than the retention gets 410 and has to sync from scratch.
+PRODUCT_TOMBSTONE_RETENTION_DAYS = float(
+    os.getenv("PRODUCT_TOMBSTONE_RETENTION_DAYS", 30)
+)
+PRODUCT_TOMBSTONE_PRUNE_SECONDS = float(
+    os.getenv("PRODUCT_TOMBSTONE_PRUNE_SECONDS", 3600)
+)
+PRODUCT_TOMBSTONE_PRUNE_BATCH = int(
+    os.getenv("PRODUCT_TOMBSTONE_PRUNE_BATCH", 5000)
+)
+
+# Bulk product import
+PRODUCT_IMPORT_BATCH_SIZE = int(os.getenv("PRODUCT_IMPORT_BATCH_SIZE", 1000))
+PRODUCT_IMPORT_IMAGE_BATCH_SIZE = int(
+    os.getenv("PRODUCT_IMPORT_IMAGE_BATCH_SIZE", 50)
+)
+PRODUCT_IMPORT_FETCH_TIMEOUT = float(
+    os.getenv("PRODUCT_IMPORT_FETCH_TIMEOUT", 10)
+)
+PRODUCT_IMPORT_MAX_IMAGE_BYTES = int(
+    os.getenv("PRODUCT_IMPORT_MAX_IMAGE_BYTES", 10 * 1024 * 1024)
+)
+
+# Shopping carts live in Redis and are written back to Postgres in
+# batches of CART_FLUSH_BATCH users every CART_FLUSH_SECONDS. An idle
+# cart is evicted from Redis after CART_TTL_SECONDS and rehydrated from
+# Postgres on the next access.
+CART_TTL_SECONDS = int(os.getenv("CART_TTL_SECONDS", 7 * 24 * 3600))
+CART_FLUSH_SECONDS = float(os.getenv("CART_FLUSH_SECONDS", 2))
+CART_FLUSH_BATCH = int(os.getenv("CART_FLUSH_BATCH", 200))
+CART_MAX_ITEMS = int(os.getenv("CART_MAX_ITEMS", 100))
+CART_MAX_QTY = int(os.getenv("CART_MAX_QTY", 99))
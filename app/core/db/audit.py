@@ -0,0 +1,45 @@
+"""
+Static index audit over ``Base.metadata``.
+
+Reports foreign key columns that are not the leading column of any
+index (every join and ``ON DELETE`` check on them is a sequential scan).
+"""
+from dataclasses import dataclass
+from sqlalchemy import MetaData, Table, UniqueConstraint
+
+
+@dataclass(frozen=True)
+class Finding:
+    table: str
+    column: str
+
+    def __str__(self) -> str:
+        return f"{self.table}.{self.column}: foreign key without an index"
+
+
+def leading_columns(table: Table) -> set[str]:
+    """Columns that some index can serve as its first key."""
+    leading = set()
+    for index in table.indexes:
+        cols = list(index.columns)
+        if cols:
+            leading.add(cols[0].name)
+    for constraint in table.constraints:
+        cols = list(getattr(constraint, "columns", []))
+        if cols and (constraint is table.primary_key
+                     or isinstance(constraint, UniqueConstraint)):
+            leading.add(cols[0].name)
+    for column in table.columns:
+        if column.unique or column.index:
+            leading.add(column.name)
+    return leading
+
+
+def audit_metadata(metadata: MetaData) -> list[Finding]:
+    findings = []
+    for table in metadata.sorted_tables:
+        leading = leading_columns(table)
+        for fk in sorted(table.foreign_keys, key=lambda f: f.parent.name):
+            if fk.parent.name not in leading:
+                findings.append(Finding(table.name, fk.parent.name))
+    return findings
@@ -0,0 +1,236 @@
+import time
+import logging
+from contextvars import ContextVar
+from typing import Any, MutableMapping
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.core.metrics import registry
+from app.config import base
+
+logger = logging.getLogger("app.db")
+
+NO_ROUTE = "-"
+
+SATURATION_BUCKETS = (0.1, 0.25, 0.5, 0.75, 0.9, 1.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+
+class RequestStats:
+    """
+    Per-request database counters. The route is resolved lazily from the
+    ASGI scope, which the router fills in once the request is matched.
+    """
+    __slots__ = ("scope", "queries", "query_time", "checkout_wait")
+
+    def __init__(self, scope: MutableMapping[str, Any] | None = None) -> None:
+        self.scope = scope
+        self.queries = 0
+        self.query_time = 0.0
+        self.checkout_wait = 0.0
+
+    @property
+    def route(self) -> str:
+        return route_label(self.scope)
+
+
+def route_label(scope: MutableMapping[str, Any] | None) -> str:
+    if not scope:
+        return NO_ROUTE
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return "unmatched"
+    return path
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar(
+    "db_request_stats", default=None
+)
+
+
+def begin_request(scope: MutableMapping[str, Any]) -> RequestStats:
+    stats = RequestStats(scope)
+    _request_stats.set(stats)
+    return stats
+
+
+def current_route() -> str:
+    stats = _request_stats.get()
+    return stats.route if stats else NO_ROUTE
+
+
+db_checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection.",
+    ["route"],
+)
+db_checkout_saturation = registry.histogram(
+    "db_pool_checkout_saturation",
+    "Share of the pool (size + max_overflow) in use right after a checkout.",
+    ["route"],
+    buckets=SATURATION_BUCKETS,
+)
+db_overflow_checkouts = registry.counter(
+    "db_pool_overflow_checkouts_total",
+    "Checkouts served while the pool was running on overflow connections.",
+    ["route"],
+)
+db_checkout_timeouts = registry.counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that failed waiting for a connection.",
+    ["route"],
+)
+db_queries = registry.counter(
+    "db_queries_total",
+    "Statements executed.",
+    ["route"],
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds",
+    "Statement execution latency.",
+    ["route"],
+)
+db_queries_per_request = registry.histogram(
+    "db_queries_per_request",
+    "Statements executed by a single HTTP request.",
+    ["route"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+db_slow_queries = registry.counter(
+    "db_slow_queries_total",
+    "Statements slower than DB_SLOW_QUERY_MS.",
+    ["route"],
+)
+db_n_plus_one = registry.counter(
+    "db_n_plus_one_requests_total",
+    "Requests that exceeded DB_N_PLUS_ONE_THRESHOLD statements.",
+    ["route"],
+)
+
+_pool: Pool | None = None
+
+
+def _pool_stat(name: str) -> float:
+    if _pool is None:
+        raise LookupError("pool not instrumented")
+    return float(getattr(_pool, name)())
+
+
+def _pool_capacity(pool: Pool) -> int:
+    return pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+
+
+def _pool_saturation() -> float:
+    if _pool is None:
+        raise LookupError("pool not instrumented")
+    capacity = _pool_capacity(_pool)
+    return _pool.checkedout() / capacity if capacity else 0.0
+
+
+registry.gauge(
+    "db_pool_size", "Configured pool size.",
+    callback=lambda: _pool_stat("size"),
+)
+registry.gauge(
+    "db_pool_checked_out", "Connections currently checked out.",
+    callback=lambda: _pool_stat("checkedout"),
+)
+registry.gauge(
+    "db_pool_overflow", "Overflow connections currently open.",
+    callback=lambda: max(_pool_stat("overflow"), 0),
+)
+registry.gauge(
+    "db_pool_saturation", "Checked out connections over pool capacity.",
+    callback=_pool_saturation,
+)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that times how long each checkout waits for a connection.
+    Pool events fire after a connection is handed out, so the wait can
+    only be measured around ``_do_get``.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            db_checkout_timeouts.inc(route=current_route())
+            raise
+        wait = time.perf_counter() - start
+
+        stats = _request_stats.get()
+        route = stats.route if stats else NO_ROUTE
+        if stats is not None:
+            stats.checkout_wait += wait
+        db_checkout_wait.observe(wait, route=route)
+
+        capacity = _pool_capacity(self)
+        if capacity:
+            db_checkout_saturation.observe(
+                self.checkedout() / capacity, route=route
+            )
+        if self.overflow() > 0:
+            db_overflow_checkouts.inc(route=route)
+        return conn
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters,
+                           context, executemany) -> None:
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters,
+                          context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+
+    stats = _request_stats.get()
+    route = stats.route if stats else NO_ROUTE
+    if stats is not None:
+        stats.queries += 1
+        stats.query_time += elapsed
+
+    db_queries.inc(route=route)
+    db_query_duration.observe(elapsed, route=route)
+
+    if base.DB_SLOW_QUERY_MS and elapsed * 1000 >= base.DB_SLOW_QUERY_MS:
+        db_slow_queries.inc(route=route)
+        logger.warning(
+            "slow query",
+            extra={
+                "route": route,
+                "duration_ms": round(elapsed * 1000, 2),
+                "statement": statement,
+            },
+        )
+
+
+def _handle_error(exception_context) -> None:
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def end_request(stats: RequestStats) -> None:
+    route = stats.route
+    db_queries_per_request.observe(stats.queries, route=route)
+    threshold = base.DB_N_PLUS_ONE_THRESHOLD
+    if threshold and stats.queries > threshold:
+        db_n_plus_one.inc(route=route)
+        logger.warning(
+            "possible N+1: request issued %d statements",
+            stats.queries,
+            extra={"route": route, "statements": stats.queries},
+        )
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    global _pool
+    sync_engine = engine.sync_engine
+    _pool = sync_engine.pool
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
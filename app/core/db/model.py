@@ -1,6 +1,8 @@
 import uuid
 from sqlalchemy import (
     func,
+    text,
+    Index,
     Integer,
     DateTime,
     MetaData,
@@ -15,6 +17,22 @@ from sqlalchemy.orm import (
 from app.utils import camel_to_snake
 from app.config import base
 
+LIVE_ROW_PREDICATE = "deleted_at IS NULL"
+
+
+def live_index(table: str, *columns: str) -> Index:
+    """
+    Partial index restricted to rows that are not soft-deleted, matching
+    the ``deleted_at IS NULL`` filter BaseCRUD adds to every query. Only
+    worth it on the columns a query filters or sorts on: a lookup by
+    ``id`` or ``uuid`` already goes through their unique indexes.
+    """
+    return Index(
+        f"ix_{table}_{'_'.join(columns)}_live",
+        *columns,
+        postgresql_where=text(LIVE_ROW_PREDICATE),
+    )
+
 
 class Base(DeclarativeBase):
     __abstract__ = True
@@ -10,6 +10,7 @@ from sqlalchemy.ext.asyncio import (
 )
 
 from app.config import base
+from app.core.db.instrumentation import InstrumentedQueuePool, instrument_engine
 
 
 class DatabaseSessionManager:
@@ -20,12 +21,21 @@ class DatabaseSessionManager:
             "pool_size": 10,
             "max_overflow": 5,
             "pool_timeout": 30,
-            "pool_recycle": 1800
+            "pool_recycle": 1800,
+            "poolclass": InstrumentedQueuePool,
+            # The changes feed stops waiting for a transaction after
+            # PRODUCT_CHANGES_MAX_HOLD_SECONDS; abort an idle one before
+            # that so it cannot commit rows the feed has moved past
+            "connect_args": {"server_settings": {
+                "idle_in_transaction_session_timeout":
+                    str(int(base.PRODUCT_CHANGES_MAX_HOLD_SECONDS * 1000 / 2)),
+            }},
         }
         self._engine = create_async_engine(
             host,  # type: ignore
             **{**defaults, **engine_kw}
         )
+        instrument_engine(self._engine)
 
         self._sessionmaker = async_sessionmaker(
             bind=self._engine,
@@ -64,6 +74,7 @@ class DatabaseSessionManager:
                 yield session
             except SQLAlchemyError:
                 await session.rollback()
+                raise
             finally:
                 await session.close()
 
@@ -0,0 +1,330 @@
+"""
+Minimal in-process metrics registry rendered in the
+Prometheus text exposition format (version 0.0.4).
+
+With several worker processes each one only sees its own values, and a
+scrape lands on any of them. When ``METRICS_DIR`` is set, every worker
+writes a snapshot of its registry there (``SnapshotWriter``) and
+``/metrics`` renders the sum over all snapshots: counters and
+histograms include workers that have exited, so they never go back,
+gauges only count workers still running.
+"""
+import os
+import json
+import math
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Iterable
+from app.config import base
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return (value.replace("\\", "\\\\")
+                 .replace("\n", "\\n")
+                 .replace('"', '\\"'))
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues,
+                   extra: dict[str, str] | None = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    for n, v in (extra or {}).items():
+        pairs.append(f'{n}="{_escape(v)}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, "
+                f"got {tuple(labels)}"
+            )
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def items(self) -> list[tuple[LabelValues, Any]]:
+        """Current (label values, value) pairs."""
+        with self._lock:
+            return [(k, v) for k, v in self._values.items()]
+
+    def combine(self, a: Any, b: Any) -> Any:
+        """Value of one series summed over two workers."""
+        return a + b
+
+    def samples(self, items: list[tuple[LabelValues, Any]] | None = None) -> list[str]:
+        if items is None:
+            items = self.items()
+        return [
+            f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}"
+            for k, v in items
+        ]
+
+    def render(self, items: list[tuple[LabelValues, Any]] | None = None) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self.samples(items),
+        ]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    Gauge whose value is either set explicitly or,
+    when ``callback`` is given, computed at scrape time.
+    """
+    type_name = "gauge"
+
+    def __init__(self, *args,
+                 callback: Callable[[], float] | None = None,
+                 **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: dict[LabelValues, float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def items(self) -> list[tuple[LabelValues, Any]]:
+        if self._callback is not None:
+            try:
+                return [((), float(self._callback()))]
+            except Exception:
+                return []
+        return super().items()
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, *args,
+                 buckets: Iterable[float] = DEFAULT_BUCKETS,
+                 **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [bucket counts..., sum, count]
+        self._values: dict[LabelValues, list[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def items(self) -> list[tuple[LabelValues, Any]]:
+        with self._lock:
+            return [(k, list(v)) for k, v in self._values.items()]
+
+    def combine(self, a: list[float], b: list[float]) -> list[float]:
+        return [x + y for x, y in zip(a, b)]
+
+    def samples(self, items: list[tuple[LabelValues, Any]] | None = None) -> list[str]:
+        if items is None:
+            items = self.items()
+        lines = []
+        for key, state in items:
+            for i, bound in enumerate(self.buckets):
+                labels = _format_labels(
+                    self.labelnames, key, {"le": _format_value(bound)}
+                )
+                lines.append(
+                    f"{self.name}_bucket{labels} {_format_value(state[i])}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(state[-1])}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str,
+                labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str,
+              labelnames: Iterable[str] = (),
+              callback: Callable[[], float] | None = None) -> Gauge:
+        return self.register(
+            Gauge(name, documentation, labelnames, callback=callback)
+        )
+
+    def histogram(self, name: str, documentation: str,
+                  labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(
+            Histogram(name, documentation, labelnames, buckets=buckets)
+        )
+
+    def render(self, snapshots: list[dict] | None = None) -> str:
+        """
+        This process's values, or with ``snapshots`` (see
+        ``read_snapshots``) their sum over every worker.
+        """
+        if snapshots is None:
+            return "\n".join(m.render() for m in self._metrics.values()) + "\n"
+        parts = []
+        for metric in self._metrics.values():
+            merged: dict[LabelValues, Any] = {}
+            for snapshot in snapshots:
+                if isinstance(metric, Gauge) and not snapshot["alive"]:
+                    continue
+                for labels, value in snapshot["metrics"].get(metric.name, []):
+                    key = tuple(labels)
+                    merged[key] = (
+                        value if key not in merged
+                        else metric.combine(merged[key], value)
+                    )
+            parts.append(metric.render(list(merged.items())))
+        return "\n".join(parts) + "\n"
+
+    def snapshot(self) -> dict[str, list]:
+        return {
+            name: [[list(k), v] for k, v in metric.items()]
+            for name, metric in self._metrics.items()
+        }
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def read_snapshots(directory: str) -> list[dict]:
+    """Every worker's last snapshot in ``directory``."""
+    snapshots = []
+    for path in Path(directory).glob("*.json"):
+        try:
+            metrics = json.loads(path.read_text())
+        except (OSError, ValueError):
+            # Removed or half written by a worker that just died
+            continue
+        pid = int(path.stem)
+        snapshots.append({"alive": _alive(pid), "metrics": metrics})
+    return snapshots
+
+
+class SnapshotWriter:
+    """
+    Writes this worker's registry to ``<directory>/<pid>.json`` every
+    ``interval`` seconds and once more on ``stop``. Does nothing
+    without a directory.
+    """
+
+    def __init__(self, registry: Registry, directory: str, interval: float) -> None:
+        self._registry = registry
+        self._directory = directory
+        self._interval = interval
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._directory)
+
+    def write(self) -> None:
+        if not self.enabled:
+            return
+        path = Path(self._directory) / f"{os.getpid()}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._registry.snapshot()))
+        # Readers never see a partial file
+        tmp.replace(path)
+
+    async def start(self) -> None:
+        if self.enabled:
+            Path(self._directory).mkdir(parents=True, exist_ok=True)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            self.write()
+        except OSError as e:
+            logger.warning("final metrics snapshot failed: %s", e)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                self.write()
+            except OSError as e:
+                logger.warning("metrics snapshot failed: %s", e)
+
+
+registry = Registry()
+snapshots = SnapshotWriter(registry, base.METRICS_DIR, base.METRICS_SYNC_SECONDS)
@@ -1,16 +1,138 @@
+import re
+import json
+import time
+import zlib
+import random
 import asyncio
+import logging
+from collections import deque
+from fnmatch import fnmatchcase
+from urllib.parse import urlsplit, urlunsplit
 from app.config import base
 from redis import asyncio as redis
+from redis.asyncio.client import PubSub
+from app.core.jwt import decode_jwt_token
 from app.utils.auth import claim_token
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
 from fastapi import WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
+from app.core.db.redis import redis_client
 from app.core.db.sessionmanager import get_session
-from typing import Any, AsyncGenerator, AsyncIterator
+from app.core.metrics import registry
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Iterator
+
+try:
+    import msgpack
+except ImportError:  # optional, see the "msgpack" extra
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+# What Broadcast does when a subscriber queue is full
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+DISCONNECT = "disconnect"
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, DISCONNECT)
+
+# How ProtectedWebSocket authenticates
+WS_AUTH_NONE = "none"
+WS_AUTH_DB = "db"
+WS_AUTH_JWT = "jwt"
+WS_AUTH_MODES = (WS_AUTH_NONE, WS_AUTH_DB, WS_AUTH_JWT)
+
+# lobby, or one room per store / product conversation
+ROOM_RE = re.compile(
+    r"^(lobby|(store|product):[0-9a-fA-F]{8}-?([0-9a-fA-F]{4}-?){3}[0-9a-fA-F]{12})$"
+)
+DEFAULT_ROOM = "lobby"
+
+
+def room_channel(room: str) -> str:
+    """Broadcast channel of a chat room; raises ValueError if invalid."""
+    if not ROOM_RE.match(room):
+        raise ValueError(f"Invalid room {room!r}")
+    return f"chat:{room.lower()}"
+
+
+def user_channel(user_uuid: str) -> str:
+    """
+    Channel for events addressed to one user. Only nodes holding one of
+    the user's sockets subscribe to it, so publishing reaches just those.
+    """
+    return f"user:{str(user_uuid).lower()}"
+
+
+broadcast_delivered = registry.counter(
+    "broadcast_delivered_total",
+    "Events queued to local subscribers.",
+)
+ws_idle_evicted = registry.counter(
+    "ws_idle_evicted_total",
+    "Websockets closed for not answering heartbeats.",
+)
+broadcast_overflow = registry.counter(
+    "broadcast_overflow_total",
+    "Events that hit a full subscriber queue, by the policy applied.",
+    ["policy"],
+)
+broadcast_shard_reconnects = registry.counter(
+    "broadcast_shard_reconnects_total",
+    "Pub/sub shard reads that failed and were retried.",
+)
+
+broadcast_stream_reconnects = registry.counter(
+    "broadcast_stream_reconnects_total",
+    "Stream reads (XREAD) that failed and were retried.",
+)
+
+# Backoff of a pub/sub shard or the stream reader reconnecting, in seconds
+SHARD_RETRY_BASE = 0.5
+SHARD_RETRY_MAX = 30
+
+
+ws_auth = registry.counter(
+    "ws_auth_total",
+    "Websocket authentication attempts, by outcome.",
+    ["mode", "result"],
+)
+
+# Bounds how many sockets authenticate at once, so a reconnect storm
+# after a restart queues here instead of on the database pool
+_admission = asyncio.Semaphore(base.WS_AUTH_CONCURRENCY)
+
+PRESENCE_NODES = "presence:nodes"
+PRESENCE_BATCH = 1000
+
+# Close codes
+CLOSE_NORMAL = 1000
+CLOSE_GOING_AWAY = 1001
+CLOSE_POLICY_VIOLATION = 1008
+CLOSE_MESSAGE_TOO_BIG = 1009
+CLOSE_SERVICE_RESTART = 1012
+CLOSE_TRY_AGAIN_LATER = 1013
+
+PING_FRAME = json.dumps({"type": "ping"})
+# Sent ahead of a replay that could not cover everything the client
+# missed; the client should resync from scratch (e.g. reload history)
+GAP_FRAME = json.dumps({"type": "gap"})
 
 
 class ProtectedWebSocket:
-    def __init__(self, ws: WebSocket):
+    """
+    Websocket whose first frame must be ``{"type": "authorization",
+    "token": <access token>}``.
+
+    ``db`` mode loads the user with ``claim_token`` on connect. ``jwt``
+    mode only verifies the token and keeps its ``sub``/``role`` claims,
+    without touching the database.
+    """
+
+    def __init__(self, ws: WebSocket, mode: str = base.WS_AUTH_MODE):
+        if mode not in WS_AUTH_MODES:
+            raise ValueError(f"mode must be one of {WS_AUTH_MODES}")
         self._user = None
+        self._role: str | None = None
+        self._mode = mode
         self._error = {
             "type": "error",
             "payload": {
@@ -20,8 +142,18 @@ class ProtectedWebSocket:
         }
         self._ws = ws
 
+    @property
+    def user_uuid(self) -> str | None:
+        return self._user
+
+    @property
+    def role(self) -> str | None:
+        return self._role
+
     async def accept(self, *args, **kwargs) -> None:
         await self._ws.accept(*args, **kwargs)
+        if self._mode == WS_AUTH_NONE:
+            return
         try:
             data = await asyncio.wait_for(self._ws.receive_json(), timeout=12)
         except Exception:
@@ -30,26 +162,65 @@ class ProtectedWebSocket:
         t_type = data.get("type", "")
         token = str(data.get("token", ""))
         if t_type != "authorization":
-            print("no auth")
-            raise WebSocketDisconnect
+            logger.info("websocket closed: first frame was not authorization",
+                        extra={"frame_type": t_type})
+            await self._close(CLOSE_POLICY_VIOLATION)
+
+        try:
+            await asyncio.wait_for(
+                _admission.acquire(), base.WS_AUTH_ADMISSION_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            ws_auth.inc(mode=self._mode, result="overloaded")
+            await self._close(CLOSE_TRY_AGAIN_LATER)
+        try:
+            await self._authenticate(token)
+        except ValueError:
+            ws_auth.inc(mode=self._mode, result="unauthorized")
+            await self._ws.send_json(self._error)
+            await self._close(CLOSE_POLICY_VIOLATION)
+        finally:
+            _admission.release()
+        ws_auth.inc(mode=self._mode, result="ok")
+
+    async def _authenticate(self, token: str) -> None:
+        if self._mode == WS_AUTH_JWT:
+            payload = decode_jwt_token(token)
+            if payload.get("type") != "access":
+                raise ValueError("Not access Token")
+            if not payload.get("sub"):
+                raise ValueError("Invalid token")
+            self._user = str(payload["sub"])
+            self._role = payload.get("role")
+            return
+
         async for db in get_session():
-            try:
-                user = await claim_token(
-                        db=db,
-                        token=token,
-                        token_type="access"
-                    )
-            except ValueError:
-                await self._ws.send_json(self._error)
-                raise WebSocketDisconnect
-            self._user = user.uuid
+            user = await claim_token(db=db, token=token, token_type="access")
+            self._user = str(user.uuid)
+            self._role = user.role.value
             break
 
+    async def _close(self, code: int) -> None:
+        await self._ws.close(code)
+        raise WebSocketDisconnect(code)
+
 
 class Event:
-    def __init__(self, channel: str, message: str) -> None:
+    def __init__(
+        self,
+        channel: str,
+        message: str,
+        pattern: str | None = None,
+        id: str | None = None,
+    ) -> None:
         self.channel = channel
         self.message = message
+        # set when the event was delivered through a pattern subscription
+        self.pattern = pattern
+        # stream entry id, only set by backends that can replay
+        self.id = id
+        # binary encoding, filled in by the first socket that needs it
+        self.packed: bytes | None = None
 
     def __eq__(self, other: object) -> bool:
         return isinstance(other, Event) and self.channel == other.channel and self.message == other.message
@@ -58,6 +229,12 @@ class Event:
         return f"Event(channel={self.channel!r}, message={self.message!r})"
 
 
+def stream_id_key(event_id: str) -> tuple[int, int]:
+    """Sortable form of a Redis stream id (``<ms>-<seq>``)."""
+    ms, _, seq = event_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
 class Unsubscribed(Exception):
     pass
 
@@ -65,6 +242,10 @@ class Unsubscribed(Exception):
 class Subscriber:
     def __init__(self, queue: asyncio.Queue[Event | None]) -> None:
         self._queue = queue
+        self._closed = False
+        self._replay: deque[Event] = deque()
+        # channel -> newest stream id replayed from it
+        self._replayed_up_to: dict[str, tuple[int, int]] = {}
 
     async def __aiter__(self) -> AsyncGenerator[Event | None, None]:
         try:
@@ -73,78 +254,679 @@ class Subscriber:
         except Unsubscribed:
             pass
 
+    def replay(self, events: list[Event]) -> None:
+        """
+        Deliver ``events`` ahead of anything live. Live events the replay
+        already covered (same or older stream id on the same channel)
+        are skipped.
+        """
+        self._replay.extend(events)
+        for event in events:
+            if event.id is not None:
+                key = stream_id_key(event.id)
+                if key > self._replayed_up_to.get(event.channel, (0, 0)):
+                    self._replayed_up_to[event.channel] = key
+
+    def _is_new(self, event: Event) -> bool:
+        if event.id is None:
+            return True
+        seen = self._replayed_up_to.get(event.channel)
+        return seen is None or stream_id_key(event.id) > seen
+
+    def _take_nowait(self) -> Event | None:
+        if self._replay:
+            return self._replay.popleft()
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return None
+            if item is None:
+                self._closed = True
+                return None
+            if self._is_new(item):
+                return item
+
     async def get(self) -> Event:
-        item = await self._queue.get()
-        if item is None:
-            raise Unsubscribed()
-        return item
+        while True:
+            if self._closed:
+                raise Unsubscribed()
+            if self._replay:
+                return self._replay.popleft()
+            item = await self._queue.get()
+            if item is None:
+                self._closed = True
+                raise Unsubscribed()
+            if self._is_new(item):
+                return item
+
+    async def get_batch(
+        self,
+        max_events: int,
+        max_bytes: int,
+        window: float,
+    ) -> list[Event]:
+        """
+        Wait for one event, then keep collecting whatever arrives within
+        ``window`` seconds until ``max_events`` or ``max_bytes`` is hit.
+        Events already queued are taken without waiting. If the
+        subscription ends mid-batch, the batch is returned first and the
+        next call raises ``Unsubscribed``.
+        """
+        first = await self.get()
+        batch = [first]
+        size = len(first.message)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + window
+
+        while len(batch) < max_events and size < max_bytes:
+            item = self._take_nowait()
+            if item is None:
+                if self._closed:
+                    break
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    self._closed = True
+                    break
+                if not self._is_new(item):
+                    continue
+            batch.append(item)
+            size += len(item.message)
+        return batch
+
+
+def _frame_item(event: Event) -> str:
+    if event.id is None:
+        return event.message
+    return f'{{"id":"{event.id}","data":{event.message}}}'
+
+
+def encode_frame(events: list[Event]) -> str:
+    """
+    One text frame for a batch of events. Messages are published as
+    JSON already, so a batch is just their JSON array; a single event
+    is sent as is. Events that carry a stream id are wrapped as
+    ``{"id": ..., "data": ...}`` so clients can resume from it.
+    """
+    if len(events) == 1:
+        return _frame_item(events[0])
+    return "[" + ",".join(_frame_item(e) for e in events) + "]"
+
+
+class PayloadTooLarge(ValueError):
+    pass
+
+
+class JsonProtocol:
+    """Default wire format: JSON text frames."""
+    subprotocol: str | None = None
+
+    def __init__(self, max_payload: int = base.WS_MAX_PAYLOAD) -> None:
+        self._max_payload = max_payload
+
+    async def receive(self, ws: WebSocket) -> dict:
+        text = await ws.receive_text()
+        if len(text.encode()) > self._max_payload:
+            raise PayloadTooLarge()
+        data = json.loads(text)
+        if not isinstance(data, dict):
+            raise ValueError("expected an object")
+        return data
+
+    async def send_events(self, ws: WebSocket, events: list[Event]) -> None:
+        await ws.send_text(encode_frame(events))
+
+
+class MsgpackProtocol(JsonProtocol):
+    """
+    ``chat.msgpack``: event frames are binary, one flag byte followed by
+    a MessagePack body, deflated when larger than ``compress_threshold``
+    bytes (flag ``1``) and sent as is otherwise (flag ``0``). A batch is a
+    MessagePack array. Control frames (ping, errors, reconnect) stay
+    JSON text, and inbound frames may be either.
+
+    Each event is packed once and the bytes are kept on the Event, which
+    is shared by every subscriber queue it was fanned out to.
+    """
+    subprotocol = "chat.msgpack"
+
+    RAW = 0
+    DEFLATED = 1
+
+    def __init__(
+        self,
+        max_payload: int = base.WS_MAX_PAYLOAD,
+        compress_threshold: int = base.WS_COMPRESS_THRESHOLD,
+    ) -> None:
+        super().__init__(max_payload)
+        self._compress_threshold = compress_threshold
+
+    async def receive(self, ws: WebSocket) -> dict:
+        message = await ws.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        if message.get("bytes") is None:
+            text = message.get("text") or ""
+            if len(text.encode()) > self._max_payload:
+                raise PayloadTooLarge()
+            data = json.loads(text)
+        else:
+            try:
+                data = msgpack.unpackb(self._unframe(message["bytes"]))
+            except msgpack.UnpackException as e:
+                raise ValueError(str(e)) from e
+        if not isinstance(data, dict):
+            raise ValueError("expected a map")
+        return data
+
+    async def send_events(self, ws: WebSocket, events: list[Event]) -> None:
+        await ws.send_bytes(self.frame(events))
+
+    def frame(self, events: list[Event]) -> bytes:
+        if len(events) == 1:
+            body = self.pack(events[0])
+        else:
+            body = _msgpack_array_header(len(events)) + b"".join(
+                self.pack(e) for e in events
+            )
+        if self._compress_threshold and len(body) > self._compress_threshold:
+            return bytes((self.DEFLATED,)) + zlib.compress(body)
+        return bytes((self.RAW,)) + body
+
+    @staticmethod
+    def pack(event: Event) -> bytes:
+        packed = event.packed
+        if packed is None:
+            data = json.loads(event.message)
+            if event.id is not None:
+                data = {"id": event.id, "data": data}
+            packed = event.packed = msgpack.packb(data)
+        return packed
+
+    def _unframe(self, frame: bytes) -> bytes:
+        if not frame:
+            raise ValueError("empty frame")
+        if len(frame) > self._max_payload + 1:
+            raise PayloadTooLarge()
+        flag, body = frame[0], frame[1:]
+        if flag == self.RAW:
+            return body
+        if flag != self.DEFLATED:
+            raise ValueError("unknown frame flag")
+        inflater = zlib.decompressobj()
+        body = inflater.decompress(body, self._max_payload + 1)
+        if len(body) > self._max_payload or inflater.unconsumed_tail:
+            raise PayloadTooLarge()
+        return body
+
+
+def _msgpack_array_header(n: int) -> bytes:
+    if n < 16:
+        return bytes((0x90 | n,))
+    if n < 1 << 16:
+        return b"\xdc" + n.to_bytes(2, "big")
+    return b"\xdd" + n.to_bytes(4, "big")
+
+
+if base.WS_PER_MESSAGE_DEFLATE and base.WS_COMPRESS_THRESHOLD > 0:
+    # permessage-deflate would deflate the already deflated frames again
+    raise ValueError(
+        "WS_COMPRESS_THRESHOLD must be 0 when WS_PER_MESSAGE_DEFLATE is on"
+    )
+
+
+def negotiate_protocol(ws: WebSocket) -> JsonProtocol:
+    """
+    Pick the wire format from the client's ``Sec-WebSocket-Protocol``
+    offer. MessagePack is only offered when ``msgpack`` is installed
+    (``pip install .[msgpack]``).
+    """
+    offered = ws.scope.get("subprotocols") or []
+    if msgpack is not None and MsgpackProtocol.subprotocol in offered:
+        return MsgpackProtocol()
+    return JsonProtocol()
+
+
+class MemoryBackend:
+    """
+    In-process backend for a single node (and tests): publishing is a
+    queue put, no Redis involved. Patterns use Redis-style globs.
+    """
+    supports_patterns = True
+
+    def __init__(self) -> None:
+        self._channels: set[str] = set()
+        self._patterns: set[str] = set()
+        self._queue: asyncio.Queue[Event] = asyncio.Queue()
+
+    async def connect(self) -> None:
+        pass
+
+    async def disconnect(self) -> None:
+        self._channels.clear()
+        self._patterns.clear()
+
+    async def subscribe(self, channel: str) -> None:
+        self._channels.add(channel)
+
+    async def unsubscribe(self, channel: str) -> None:
+        self._channels.discard(channel)
+
+    async def psubscribe(self, pattern: str) -> None:
+        self._patterns.add(pattern)
+
+    async def punsubscribe(self, pattern: str) -> None:
+        self._patterns.discard(pattern)
+
+    async def publish(self, channel: str, message: Any) -> None:
+        if channel in self._channels:
+            self._queue.put_nowait(Event(channel=channel, message=message))
+        for pattern in self._patterns:
+            if fnmatchcase(channel, pattern):
+                self._queue.put_nowait(
+                    Event(channel=channel, message=message, pattern=pattern)
+                )
+
+    async def next_published(self) -> Event:
+        return await self._queue.get()
+
+
+class PubSubShard:
+    """
+    One pub/sub connection and the task reading it. With ``sharded``
+    the channels are taken with ``SSUBSCRIBE`` (Redis 7 sharded pub/sub),
+    which redis-py's asyncio ``PubSub`` does not track, so they are kept
+    here and re-subscribed when the connection is re-established.
+    """
+
+    def __init__(
+        self,
+        pubsub: PubSub,
+        deliver: Callable[[Event], Awaitable[None]],
+        sharded: bool = False,
+    ) -> None:
+        self._pubsub = pubsub
+        self._deliver = deliver
+        self._sharded = sharded
+        self._shard_channels: set[str] = set()
+        self._listener: asyncio.Task[None] | None = None
+        # Failed reads since the connection last delivered anything
+        self._failures = 0
+
+    async def connect(self) -> None:
+        await self._pubsub.connect()  # type: ignore[no-untyped-call]
+        if self._sharded:
+            self._pubsub.connection.register_connect_callback(self._resubscribe)
+        self._listener = asyncio.create_task(self._read())
+
+    async def disconnect(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+        await self._pubsub.aclose()  # type: ignore[no-untyped-call]
+
+    async def subscribe(self, channel: str) -> None:
+        if self._sharded:
+            self._shard_channels.add(channel)
+            await self._pubsub.execute_command("SSUBSCRIBE", channel)
+        else:
+            await self._pubsub.subscribe(channel)
+
+    async def unsubscribe(self, channel: str) -> None:
+        if self._sharded:
+            self._shard_channels.discard(channel)
+            await self._pubsub.execute_command("SUNSUBSCRIBE", channel)
+        else:
+            await self._pubsub.unsubscribe(channel)
+
+    async def psubscribe(self, pattern: str) -> None:
+        await self._pubsub.psubscribe(pattern)
+
+    async def punsubscribe(self, pattern: str) -> None:
+        await self._pubsub.punsubscribe(pattern)
+
+    async def _resubscribe(self, connection: Any) -> None:
+        if self._shard_channels:
+            await connection.send_command("SSUBSCRIBE", *self._shard_channels)
+
+    async def _read(self) -> None:
+        """
+        Read until cancelled. A dropped connection is logged and retried
+        with capped exponential backoff; the next read reconnects and
+        redis-py (or ``_resubscribe``) restores the subscriptions, so
+        the channels of this shard do not go silent for good.
+        """
+        while True:
+            try:
+                await self._read_messages()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failures += 1
+                delay = min(SHARD_RETRY_MAX, SHARD_RETRY_BASE * 2 ** (self._failures - 1))
+                broadcast_shard_reconnects.inc()
+                logger.warning("pub/sub shard read failed (%s), reconnecting in %.1fs",
+                               e, delay)
+                connection = self._pubsub.connection
+                if connection is not None:
+                    await connection.disconnect()
+                await asyncio.sleep(random.uniform(delay / 2, delay))
+
+    async def _read_messages(self) -> None:
+        # get_message rather than listen(): listen() stops as soon as
+        # PubSub thinks nothing is subscribed, which is always the case
+        # for SSUBSCRIBE'd channels
+        while True:
+            message = await self._pubsub.get_message(timeout=None)
+            if message is None:
+                continue
+            # Reading again, so the next failure starts the backoff over
+            self._failures = 0
+            kind = message["type"]
+            if kind in ("message", "smessage"):
+                event = Event(
+                    channel=message["channel"].decode(),
+                    message=message["data"].decode(),
+                )
+            elif kind == "pmessage":
+                event = Event(
+                    channel=message["channel"].decode(),
+                    message=message["data"].decode(),
+                    pattern=message["pattern"].decode(),
+                )
+            else:
+                continue
+            await self._deliver(event)
 
 
 class RedisBackend():
+    """
+    Pub/sub over ``shards`` connections; every channel or pattern is
+    pinned to one of them by crc32, so inbound traffic is read and
+    decoded by several tasks instead of one.
+
+    When Broadcast attaches its fan-out (``attach``), shards hand
+    events to it directly; otherwise they go through ``next_published``.
+    """
     _conn: redis.Redis
 
-    def __init__(self, url: str | None = None, *, conn: redis.Redis | None = None):
+    def __init__(
+        self,
+        url: str | None = None,
+        *,
+        conn: redis.Redis | None = None,
+        shards: int = base.BROKER_PUBSUB_SHARDS,
+        sharded: bool = base.BROKER_SHARDED_PUBSUB,
+    ):
         if url is None:
             assert conn is not None, "conn must be provided if url is not"
             self._conn = conn
         else:
-            self._conn = redis.Redis.from_url(url, max_connections=base.BROKER_MAX_CONNECTIONS)
+            self._conn = redis.Redis.from_url(
+                url, max_connections=base.BROKER_MAX_CONNECTIONS + shards
+            )
+
+        self._sharded = sharded
+        self._shards = [
+            PubSubShard(self._conn.pubsub(), self._deliver, sharded)
+            for _ in range(max(1, shards))
+        ]
+        self._dispatch: Callable[[Event], None] | None = None
+        self._queue: asyncio.Queue[Event] = asyncio.Queue()
+
+    @property
+    def supports_patterns(self) -> bool:
+        # SPUBLISH is never delivered to PSUBSCRIBE
+        return not self._sharded
+
+    def attach(self, dispatch: Callable[[Event], None]) -> None:
+        self._dispatch = dispatch
+
+    def _shard(self, key: str) -> PubSubShard:
+        return self._shards[zlib.crc32(key.encode()) % len(self._shards)]
+
+    async def _deliver(self, event: Event) -> None:
+        if self._dispatch is not None:
+            self._dispatch(event)
+        else:
+            await self._queue.put(event)
+
+    async def connect(self) -> None:
+        for shard in self._shards:
+            await shard.connect()
+
+    async def disconnect(self) -> None:
+        for shard in self._shards:
+            await shard.disconnect()
+        await self._conn.aclose()
+
+    async def subscribe(self, channel: str) -> None:
+        await self._shard(channel).subscribe(channel)
+
+    async def unsubscribe(self, channel: str) -> None:
+        await self._shard(channel).unsubscribe(channel)
+
+    async def psubscribe(self, pattern: str) -> None:
+        # Broadcast refuses patterns up front when sharded
+        await self._shard(pattern).psubscribe(pattern)
+
+    async def punsubscribe(self, pattern: str) -> None:
+        await self._shard(pattern).punsubscribe(pattern)
+
+    async def publish(self, channel: str, message: Any) -> None:
+        if self._sharded:
+            await self._conn.spublish(channel, message)
+        else:
+            await self._conn.publish(channel, message)
+
+    async def next_published(self) -> Event:
+        return await self._queue.get()
+
+
+class RedisStreamsBackend:
+    """
+    Backend on Redis Streams instead of pub/sub: every channel is a
+    capped stream, so a client that reconnects can ask for what it
+    missed since the last id it saw (``read_since``).
+
+    A dedicated connection does the blocking ``XREAD`` so publishing
+    never waits behind it. Patterns are not supported by streams.
+    """
+    supports_patterns = False
 
-        self._pubsub = self._conn.pubsub()
+    def __init__(
+        self,
+        url: str,
+        maxlen: int = base.BROKER_STREAM_MAXLEN,
+        ttl: int = base.BROKER_STREAM_TTL_SECONDS,
+        block_ms: int = base.BROKER_STREAM_BLOCK_MS,
+        batch: int = base.BROKER_STREAM_BATCH,
+    ) -> None:
+        self._conn = redis.Redis.from_url(url, max_connections=base.BROKER_MAX_CONNECTIONS)
+        self._reader = redis.Redis.from_url(url)
+        self._maxlen = maxlen
+        self._ttl = ttl
+        self._block_ms = block_ms
+        self._batch = batch
+        # channel -> id of the last entry read from it
+        self._streams: dict[str, str] = {}
         self._ready = asyncio.Event()
         self._queue: asyncio.Queue[Event] = asyncio.Queue()
         self._listener: asyncio.Task[None] | None = None
 
     async def connect(self) -> None:
-        self._listener = asyncio.create_task(self._pubsub_listener())
-        await self._pubsub.connect()  # type: ignore[no-untyped-call]
+        self._listener = asyncio.create_task(self._stream_listener())
 
     async def disconnect(self) -> None:
-        await self._pubsub.aclose()  # type: ignore[no-untyped-call]
-        await self._conn.aclose()
         if self._listener is not None:
             self._listener.cancel()
+        await self._reader.aclose()
+        await self._conn.aclose()
 
     async def subscribe(self, channel: str) -> None:
+        # Start from the current tail so only new entries are delivered live
+        latest = await self._conn.xrevrange(channel, count=1)
+        self._streams[channel] = latest[0][0].decode() if latest else "0-0"
         self._ready.set()
-        await self._pubsub.subscribe(channel)
 
     async def unsubscribe(self, channel: str) -> None:
-        await self._pubsub.unsubscribe(channel)
+        self._streams.pop(channel, None)
+        if not self._streams:
+            self._ready.clear()
 
     async def publish(self, channel: str, message: Any) -> None:
-        await self._conn.publish(channel, message)
+        # Streams of rooms and users nobody writes to any more expire
+        # instead of keeping up to maxlen entries forever
+        pipe = self._conn.pipeline(transaction=False)
+        pipe.xadd(channel, {"data": message}, maxlen=self._maxlen, approximate=True)
+        pipe.expire(channel, self._ttl)
+        await pipe.execute()
 
     async def next_published(self) -> Event:
         return await self._queue.get()
 
-    async def _pubsub_listener(self) -> None:
-        # redis-py does not listen to the pubsub connection if there are no channels subscribed
-        # so we need to wait until the first channel is subscribed to start listening
+    async def read_since(
+        self,
+        channel: str,
+        last_id: str,
+        count: int,
+    ) -> tuple[list[Event], bool]:
+        """
+        Up to ``count`` entries of ``channel`` strictly after ``last_id``,
+        oldest first, and whether some entries after ``last_id`` are
+        missing from them: more than ``count`` of them, or trimmed from
+        the stream already. A stream that expired as a whole looks like
+        one nobody wrote to.
+        """
+        pipe = self._conn.pipeline(transaction=False)
+        pipe.xrange(channel, min=f"({last_id}", count=count + 1)
+        pipe.xinfo_stream(channel)
+        entries, info = await pipe.execute(raise_on_error=False)
+        gap = len(entries) > count
+        if isinstance(info, dict):
+            trimmed = info.get("max-deleted-entry-id")
+            first = info.get("first-entry")
+            if trimmed is not None:
+                gap = gap or stream_id_key(trimmed.decode()) > stream_id_key(last_id)
+            elif first is not None:
+                # Redis < 7 does not report trims; assume entries
+                # older than the first one were trimmed
+                gap = gap or stream_id_key(first[0].decode()) > stream_id_key(last_id)
+        events = [
+            self._to_event(channel, entry_id, fields)
+            for entry_id, fields in entries[:count]
+        ]
+        return events, gap
+
+    @staticmethod
+    def _to_event(channel: str, entry_id: bytes, fields: dict) -> Event:
+        return Event(
+            channel=channel,
+            message=fields[b"data"].decode(),
+            id=entry_id.decode(),
+        )
+
+    async def _stream_listener(self) -> None:
+        """
+        Read until cancelled. A failed ``XREAD`` is logged and retried
+        with capped exponential backoff, like a pub/sub shard; the next
+        read resumes after the last id delivered from each stream, so
+        nothing still in the streams is lost in between.
+        """
+        failures = 0
         while True:
             await self._ready.wait()
-            async for message in self._pubsub.listen():
-                if message["type"] == "message":
-                    event = Event(
-                        channel=message["channel"].decode(),
-                        message=message["data"].decode(),
-                    )
+            streams = dict(self._streams)
+            if not streams:
+                continue
+            try:
+                # A newly subscribed stream is only picked up once the
+                # current XREAD returns, i.e. after at most ``block_ms``.
+                response = await self._reader.xread(
+                    streams, count=self._batch, block=self._block_ms
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                delay = min(SHARD_RETRY_MAX, SHARD_RETRY_BASE * 2 ** (failures - 1))
+                broadcast_stream_reconnects.inc()
+                logger.warning("stream read failed (%s), retrying in %.1fs", e, delay)
+                await self._reader.connection_pool.disconnect()
+                await asyncio.sleep(random.uniform(delay / 2, delay))
+                continue
+            failures = 0
+            for stream, entries in response or ():
+                channel = stream.decode()
+                for entry_id, fields in entries:
+                    event = self._to_event(channel, entry_id, fields)
+                    if channel in self._streams:
+                        self._streams[channel] = event.id
                     await self._queue.put(event)
 
-            # when no channel subscribed, clear the event.
-            # And then in next loop, event will blocked again until
-            # the new channel subscribed.Now asyncio.Task will not exit again.
-            self._ready.clear()
-
 
 class Broadcast:
-    def __init__(self, url: str) -> None:
+    def __init__(
+        self,
+        url: str,
+        queue_size: int = base.BROADCAST_QUEUE_SIZE,
+        overflow_policy: str = base.BROADCAST_OVERFLOW_POLICY,
+        patterns: bool = False,
+    ) -> None:
+        """
+        ``patterns`` enables ``psubscribe``; backends that cannot deliver
+        pattern subscriptions (streams, sharded pub/sub) refuse it here
+        rather than on first use.
+        """
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"overflow_policy must be one of {OVERFLOW_POLICIES}"
+            )
         self._backend = self._create_backend(url)
+        if patterns and not self._backend.supports_patterns:
+            raise ValueError(
+                f"{type(self._backend).__name__} for {urlsplit(url).scheme}:// "
+                "does not support pattern subscriptions"
+            )
+        self._patterns_enabled = patterns
         self._subscribers: dict[str, set[asyncio.Queue[Event | None]]] = {}
+        self._patterns: dict[str, set[asyncio.Queue[Event | None]]] = {}
+        # Queues detached for falling behind, until their subscription exits
+        self._evicted: set[asyncio.Queue[Event | None]] = set()
+        self._queue_size = queue_size
+        self._overflow_policy = overflow_policy
         return
 
-    def _create_backend(self, url: str) -> RedisBackend:
-        return RedisBackend(url)
+    @property
+    def subscriber_count(self) -> int:
+        return sum(
+            len(q) for subs in (self._subscribers, self._patterns)
+            for q in subs.values()
+        )
+
+    @property
+    def channels(self) -> list[str]:
+        """Channels this node currently holds a backend subscription for."""
+        return list(self._subscribers)
+
+    def _create_backend(
+        self,
+        url: str,
+    ) -> MemoryBackend | RedisBackend | RedisStreamsBackend:
+        parts = urlsplit(url)
+        if parts.scheme == "memory":
+            return MemoryBackend()
+        if parts.scheme in ("redis", "rediss"):
+            return RedisBackend(url)
+        if parts.scheme in ("redis+streams", "rediss+streams"):
+            scheme = parts.scheme.removesuffix("+streams")
+            return RedisStreamsBackend(urlunsplit(parts._replace(scheme=scheme)))
+        raise ValueError(f"Unsupported broadcast backend {url!r}")
 
     async def __aenter__(self):
         await self.connect()
@@ -154,42 +936,460 @@ class Broadcast:
         await self.disconnect()
 
     async def connect(self) -> None:
+        attach = getattr(self._backend, "attach", None)
+        if attach is not None:
+            # The backend calls fan-out itself, no queue hop in between
+            attach(self._fan_out)
+            self._listener_task = None
+        else:
+            self._listener_task = asyncio.create_task(self._listener())
         await self._backend.connect()
-        self._listener_task = asyncio.create_task(self._listener())
 
     async def disconnect(self) -> None:
-        if self._listener_task.done():
-            self._listener_task.result()
-        else:
-            self._listener_task.cancel()
+        if self._listener_task is not None:
+            if self._listener_task.done():
+                self._listener_task.result()
+            else:
+                self._listener_task.cancel()
         await self._backend.disconnect()
 
     async def _listener(self) -> None:
         while True:
             event = await self._backend.next_published()
-            for queue in list(self._subscribers.get(event.channel, [])):
-                await queue.put(event)
+            self._fan_out(event)
+
+    def _fan_out(self, event: Event) -> None:
+        # Never awaits: one stalled subscriber cannot hold up the others
+        if event.pattern is not None:
+            queues = self._patterns.get(event.pattern, ())
+        else:
+            queues = self._subscribers.get(event.channel, ())
+        for queue in list(queues):
+            self._offer(queue, event)
+
+    def _offer(self, queue: asyncio.Queue[Event | None], event: Event) -> None:
+        if queue in self._evicted:
+            return
+        try:
+            queue.put_nowait(event)
+            broadcast_delivered.inc()
+            return
+        except asyncio.QueueFull:
+            pass
+
+        broadcast_overflow.inc(policy=self._overflow_policy)
+        if self._overflow_policy == DROP_NEWEST:
+            return
+        if self._overflow_policy == DROP_OLDEST:
+            queue.get_nowait()
+            queue.put_nowait(event)
+            broadcast_delivered.inc()
+            return
+        self._evict(queue)
+
+    def _evict(self, queue: asyncio.Queue[Event | None]) -> None:
+        """
+        Detach a slow subscriber: drop what it has not read and end its
+        iteration. The queue stays registered so that the subscriber's own
+        ``subscribe`` context, when it exits, releases the channel (and
+        the backend subscription if it was the last one) as usual.
+        """
+        self._evicted.add(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
 
     async def publish(self, channel: str, message: Any) -> None:
         await self._backend.publish(channel, message)
 
     @asynccontextmanager
-    async def subscribe(self, channel: str) -> AsyncIterator[Subscriber]:
-        queue: asyncio.Queue[Event | None] = asyncio.Queue()
+    async def subscribe(
+        self,
+        channel: str,
+        last_event_id: str | None = None,
+        replay_max: int = base.WS_REPLAY_MAX,
+    ) -> AsyncIterator[Subscriber]:
+        """
+        Local subscription to ``channel``. The node holds a single
+        backend subscription per channel, taken by the first local
+        subscriber and released by the last one.
+
+        With ``last_event_id`` and a backend that keeps history, up to
+        ``replay_max`` missed events are delivered before live ones. If
+        more were missed (or trimmed already) a ``GAP_FRAME`` event
+        comes first.
+        """
+        async with self.subscribe_many(
+            [channel], last_event_id, replay_max
+        ) as subscriber:
+            yield subscriber
+
+    @asynccontextmanager
+    async def subscribe_many(
+        self,
+        channels: list[str],
+        last_event_id: str | None = None,
+        replay_max: int = base.WS_REPLAY_MAX,
+    ) -> AsyncIterator[Subscriber]:
+        """
+        One subscriber, one queue, for several channels, e.g. a chat
+        room and the user's own channel. Replay reads every channel from
+        ``last_event_id``; stream ids are time based, so that means
+        "since then" across channels.
+        """
+        async with self._subscription(
+            self._subscribers, channels,
+            self._backend.subscribe, self._backend.unsubscribe,
+        ) as subscriber:
+            read_since = getattr(self._backend, "read_since", None)
+            if last_event_id and read_since is not None:
+                missed: list[Event] = []
+                gap = False
+                for channel in channels:
+                    events, channel_gap = await read_since(
+                        channel, last_event_id, replay_max
+                    )
+                    missed += events
+                    gap = gap or channel_gap
+                missed.sort(key=lambda e: stream_id_key(e.id))
+                if gap or len(missed) > replay_max:
+                    # Oldest events are dropped; let the client know
+                    missed = [Event(channels[0], GAP_FRAME)] + missed[-replay_max:]
+                subscriber.replay(missed)
+            yield subscriber
+
+    @asynccontextmanager
+    async def psubscribe(self, pattern: str) -> AsyncIterator[Subscriber]:
+        """
+        Like ``subscribe`` but for a glob pattern, e.g. ``chat:store:*``.
+        Needs a Broadcast created with ``patterns=True``.
+        """
+        if not self._patterns_enabled:
+            raise RuntimeError("Broadcast was created without patterns=True")
+        async with self._subscription(
+            self._patterns, [pattern],
+            self._backend.psubscribe, self._backend.punsubscribe,
+        ) as subscriber:
+            yield subscriber
+
+    @asynccontextmanager
+    async def _subscription(
+        self,
+        subs: dict[str, set[asyncio.Queue[Event | None]]],
+        keys: list[str],
+        backend_subscribe: Callable[[str], Awaitable[None]],
+        backend_unsubscribe: Callable[[str], Awaitable[None]],
+    ) -> AsyncIterator[Subscriber]:
+        queue: asyncio.Queue[Event | None] = asyncio.Queue(
+            maxsize=self._queue_size
+        )
 
         try:
-            if not self._subscribers.get(channel):
-                await self._backend.subscribe(channel)
-                self._subscribers[channel] = {queue}
-            else:
-                self._subscribers[channel].add(queue)
+            for key in keys:
+                # Registered before the await, so a concurrent first
+                # subscriber finds the set and does not subscribe again
+                queues = subs.setdefault(key, set())
+                first = not queues
+                queues.add(queue)
+                if first:
+                    await backend_subscribe(key)
 
             yield Subscriber(queue)
         finally:
-            self._subscribers[channel].remove(queue)
-            if not self._subscribers.get(channel):
-                del self._subscribers[channel]
-                await self._backend.unsubscribe(channel)
-            await queue.put(None)
+            self._evicted.discard(queue)
+            for key in keys:
+                queues = subs.get(key)
+                if queues is not None and queue in queues:
+                    queues.discard(queue)
+                    if not queues:
+                        del subs[key]
+                        await backend_unsubscribe(key)
+            try:
+                queue.put_nowait(None)
+            except asyncio.QueueFull:
+                pass
+
+
+async def close_socket(ws: WebSocket, code: int, reason: str | None = None) -> None:
+    """Close ``ws`` unless it is already closed, on either side."""
+    if ws.application_state == WebSocketState.DISCONNECTED:
+        return
+    try:
+        await ws.close(code, reason)
+    except (RuntimeError, OSError, WebSocketDisconnect):
+        pass
+
+
+async def serve_until_closed(ws: WebSocket, *loops: Awaitable[None]) -> None:
+    """
+    Run a socket's loops until the first one ends, cancel the others and
+    close the socket with 1001 if nothing closed it already.
+    """
+    tasks = [asyncio.ensure_future(loop) for loop in loops]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    closed = ws.application_state == WebSocketState.DISCONNECTED
+    for task in done:
+        exc = task.exception()
+        if exc is not None and not closed and not isinstance(exc, WebSocketDisconnect):
+            raise exc
+    await close_socket(ws, CLOSE_GOING_AWAY)
+
+
+class SocketRegistry:
+    """
+    Live websockets of this node and when each last sent a frame, used
+    for heartbeats, idle eviction and draining on shutdown.
+    """
+
+    def __init__(self) -> None:
+        self._sockets: dict[WebSocket, float] = {}
+        self.draining = False
+
+    def __len__(self) -> int:
+        return len(self._sockets)
+
+    @contextmanager
+    def track(self, ws: WebSocket) -> Iterator[None]:
+        self._sockets[ws] = time.monotonic()
+        try:
+            yield
+        finally:
+            self._sockets.pop(ws, None)
+
+    def touch(self, ws: WebSocket) -> None:
+        """Record inbound activity (any frame, including pongs)."""
+        if ws in self._sockets:
+            self._sockets[ws] = time.monotonic()
+
+    async def heartbeat(
+        self,
+        ws: WebSocket,
+        interval: float = base.WS_HEARTBEAT_SECONDS,
+        idle_timeout: float = base.WS_IDLE_TIMEOUT_SECONDS,
+        require_pong: bool = base.WS_REQUIRE_APP_PONG,
+    ) -> None:
+        """
+        Send ``{"type": "ping"}`` every ``interval`` seconds. With
+        ``require_pong`` also close the socket once no frame was received
+        for ``idle_timeout`` seconds; clients answer with
+        ``{"type": "pong"}``. Protocol-level pongs are handled by the
+        server and never reach the app, so without it a socket is only
+        dropped by those. With ``interval`` 0 this just waits until
+        cancelled.
+        """
+        if interval <= 0:
+            await asyncio.Future()
+        while True:
+            await asyncio.sleep(interval)
+            idle = time.monotonic() - self._sockets.get(ws, time.monotonic())
+            if require_pong and idle_timeout > 0 and idle >= idle_timeout:
+                ws_idle_evicted.inc()
+                await close_socket(ws, CLOSE_NORMAL, "idle timeout")
+                raise WebSocketDisconnect(CLOSE_NORMAL)
+            await ws.send_text(PING_FRAME)
+
+    async def drain(self, window: float = base.WS_DRAIN_WINDOW_SECONDS) -> None:
+        """
+        Stop admitting sockets and close the open ones with 1012. Each
+        gets a random ``reconnect_after_ms`` within ``window`` (also
+        sent as a frame, for clients that ignore close reasons) so they
+        do not all come back at the same moment.
+        """
+        self.draining = True
+        sockets = list(self._sockets)
+
+        async def hint_and_close(ws: WebSocket) -> None:
+            after_ms = int(random.uniform(0, window) * 1000)
+            try:
+                await ws.send_text(json.dumps({"type": "reconnect", "after_ms": after_ms}))
+            except (RuntimeError, OSError, WebSocketDisconnect):
+                pass
+            await close_socket(
+                ws, CLOSE_SERVICE_RESTART,
+                json.dumps({"reconnect_after_ms": after_ms}),
+            )
+
+        # One slow client must not hold up the others
+        await asyncio.gather(
+            *(hint_and_close(ws) for ws in sockets), return_exceptions=True
+        )
+        if sockets:
+            logger.info("drained %d websockets", len(sockets))
+
+
+class Presence:
+    """
+    Who is connected, across nodes.
+
+    Each node counts its sockets per user in memory and every
+    ``flush_interval`` seconds writes them to Redis in one pipeline:
+
+    * ``presence:u:<uuid>``: set for every user online here, with a TTL
+    * ``presence:node:<node>``: hash with the node's connection counts
+    * ``presence:nodes``: sorted set of nodes by last flush time
+
+    Nothing is written per message or per connect; a user who leaves
+    shows as offline once their key expires (at most ``ttl`` seconds).
+    """
+
+    def __init__(
+        self,
+        conn: redis.Redis,
+        node_id: str = base.NODE_ID,
+        flush_interval: float = base.PRESENCE_FLUSH_SECONDS,
+        ttl: int = base.PRESENCE_TTL_SECONDS,
+    ) -> None:
+        self._conn = conn
+        self.node_id = node_id
+        self._flush_interval = flush_interval
+        self._ttl = ttl
+        self._users: dict[str, int] = {}
+        self._connections = 0
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def connections(self) -> int:
+        return self._connections
+
+    @property
+    def users(self) -> int:
+        return len(self._users)
+
+    def connect(self, user_uuid: str | None) -> None:
+        self._connections += 1
+        if user_uuid is not None:
+            self._users[user_uuid] = self._users.get(user_uuid, 0) + 1
+
+    def disconnect(self, user_uuid: str | None) -> None:
+        self._connections -= 1
+        if user_uuid is not None:
+            left = self._users.get(user_uuid, 0) - 1
+            if left > 0:
+                self._users[user_uuid] = left
+            else:
+                self._users.pop(user_uuid, None)
+
+    @contextmanager
+    def track(self, user_uuid: str | None) -> Iterator[None]:
+        self.connect(user_uuid)
+        try:
+            yield
+        finally:
+            self.disconnect(user_uuid)
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        try:
+            pipe = self._conn.pipeline(transaction=False)
+            pipe.delete(self._node_key(self.node_id))
+            pipe.zrem(PRESENCE_NODES, self.node_id)
+            await pipe.execute()
+        except redis.RedisError:
+            logger.warning("presence: could not deregister node %s", self.node_id)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await self.flush()
+            except redis.RedisError as e:
+                logger.warning("presence flush failed: %s", e)
+            await asyncio.sleep(self._flush_interval)
+
+    async def flush(self) -> None:
+        now = time.time()
+        node_key = self._node_key(self.node_id)
+        users = list(self._users)
+        for start in range(0, len(users), PRESENCE_BATCH):
+            pipe = self._conn.pipeline(transaction=False)
+            for user_uuid in users[start:start + PRESENCE_BATCH]:
+                pipe.set(self._user_key(user_uuid), self.node_id, ex=self._ttl)
+            await pipe.execute()
+
+        pipe = self._conn.pipeline(transaction=False)
+        pipe.hset(node_key, mapping={
+            "connections": self._connections,
+            "users": len(users),
+            "updated_at": now,
+        })
+        pipe.expire(node_key, self._ttl)
+        pipe.zadd(PRESENCE_NODES, {self.node_id: now})
+        pipe.zremrangebyscore(PRESENCE_NODES, "-inf", now - self._ttl)
+        await pipe.execute()
+
+    async def online(self, user_uuids: list[str]) -> dict[str, bool]:
+        """Online flag for every uuid in ``user_uuids``."""
+        result: dict[str, bool] = {}
+        for start in range(0, len(user_uuids), PRESENCE_BATCH):
+            chunk = user_uuids[start:start + PRESENCE_BATCH]
+            values = await self._conn.mget([self._user_key(u) for u in chunk])
+            result.update(
+                (u, v is not None) for u, v in zip(chunk, values)
+            )
+        return result
+
+    async def nodes(self) -> list[dict]:
+        """Connection counts of every node that flushed within ``ttl``."""
+        now = time.time()
+        node_ids = await self._conn.zrangebyscore(
+            PRESENCE_NODES, now - self._ttl, "+inf"
+        )
+        pipe = self._conn.pipeline(transaction=False)
+        for node_id in node_ids:
+            pipe.hgetall(self._node_key(node_id.decode()))
+        stats = await pipe.execute()
+        return [
+            {
+                "node": node_id.decode(),
+                "connections": int(data.get(b"connections", 0)),
+                "users": int(data.get(b"users", 0)),
+                "updated_at": float(data.get(b"updated_at", 0)),
+            }
+            for node_id, data in zip(node_ids, stats)
+            if data
+        ]
+
+    @staticmethod
+    def _user_key(user_uuid: str) -> str:
+        return f"presence:u:{user_uuid}"
+
+    @staticmethod
+    def _node_key(node_id: str) -> str:
+        return f"presence:node:{node_id}"
+
 
 broadcaster = Broadcast(url=base.BROKER_URL)
+
+
+async def notify_user(user_uuid: str, payload: dict) -> None:
+    """
+    Send ``payload`` to every socket ``user_uuid`` has open, on whichever
+    nodes hold them. Nothing is delivered if the user is not connected.
+    """
+    await broadcaster.publish(user_channel(user_uuid), json.dumps(payload))
+
+registry.gauge(
+    "broadcast_subscribers",
+    "Local subscriber queues across all channels.",
+    callback=lambda: broadcaster.subscriber_count,
+)
+
+presence = Presence(redis_client)
+
+sockets = SocketRegistry()
+
+registry.gauge(
+    "ws_connections",
+    "Websocket connections held by this node.",
+    callback=lambda: presence.connections,
+)
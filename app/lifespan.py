@@ -1,6 +1,11 @@
 from fastapi import FastAPI
-from app.core.ws import broadcaster
+from app.config import base
+from app.core.ws import broadcaster, presence, sockets
+from app.utils.chat_history import chat_history
+from app.utils.cart import carts
+from app.utils.sync import tombstone_pruner
 from app.core.db.sessionmanager import sessionmanager
+from app.core.metrics import snapshots
 from contextlib import asynccontextmanager
 
 
@@ -11,8 +16,24 @@ async def lifespan(app: FastAPI):
     To understand more, read https://fastapi.tiangolo.com/advanced/events/
     """
     await broadcaster.connect()
+    await presence.start()
+    if base.CHAT_HISTORY_ENABLED:
+        await chat_history.start()
+    await carts.start()
+    await tombstone_pruner.start()
+    await snapshots.start()
     yield
+    # Normally already done by the server before it stops accepting
+    await sockets.drain()
+    await presence.stop()
+    if base.CHAT_HISTORY_ENABLED:
+        # Before the engine is disposed below
+        await chat_history.stop()
+    await carts.stop()
+    await tombstone_pruner.stop()
     if sessionmanager._engine is not None:
         # Close the DB connection
         await sessionmanager.close()
     await broadcaster.disconnect()
+    # Last, so the counters of everything above are in it
+    await snapshots.stop()
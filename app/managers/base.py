@@ -1,21 +1,42 @@
-from typing import Type, TypeVar, Generic, List, Optional, Union
+from typing import (
+    Any, Type, TypeVar, Generic, List, Optional, Sequence, Union
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update, delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import update, delete, func, insert, text
+from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
+import asyncio
+import json
+import time
 import uuid
 import logging
 
-from app.core.db.model import Base
+from app.core.db.model import Base, LIVE_ROW_PREDICATE
+from app.core.db.sessionmanager import sessionmanager
+from app.config import base
+
+logger = logging.getLogger(__name__)
 
 T = TypeVar("T", bound="Base")
 IDType = int
 UUIDType = uuid.UUID
 
+# Columns managed by the database/Base that an upsert must never overwrite
+UPSERT_PROTECTED = ("id", "uuid", "created_at")
+
+# Postgres wire protocol limit on bind parameters in one statement
+MAX_BIND_PARAMS = 32767
+
 
 class BaseCRUD(Generic[T]):
     model: Type[T] = None  # set in subclass
 
+    # (table, include_deleted) -> (exact count, monotonic time it was taken)
+    _count_cache: dict[tuple[str, bool], tuple[int, float]] = {}
+    _count_refreshing: dict[tuple[str, bool], asyncio.Task] = {}
+
     def __init__(cls, model: Type[T]):
         cls.model = model
 
@@ -77,6 +98,35 @@ class BaseCRUD(Generic[T]):
         result = await db.execute(stmt)
         return result.scalars().all()
 
+    @classmethod
+    async def get_page(
+        cls,
+        db: AsyncSession,
+        after: IDType | None = None,
+        limit: int = 50,
+        include_deleted: bool = False,
+        descending: bool = False,
+    ) -> List[T]:
+        """
+        Keyset pagination on the primary key: ``WHERE id > :after
+        ORDER BY id LIMIT :limit``. Unlike ``get_all`` with ``skip``,
+        the cost does not grow with the page depth. Pass the ``id`` of
+        the last item returned as ``after`` to get the next page.
+        """
+        stmt = select(cls.model)
+        if not include_deleted:
+            stmt = stmt.where(cls.model.deleted_at.is_(None))
+        if descending:
+            if after is not None:
+                stmt = stmt.where(cls.model.id < after)
+            stmt = stmt.order_by(cls.model.id.desc())
+        else:
+            if after is not None:
+                stmt = stmt.where(cls.model.id > after)
+            stmt = stmt.order_by(cls.model.id)
+        result = await db.execute(stmt.limit(limit))
+        return result.scalars().all()
+
     @classmethod
     async def count(cls, db: AsyncSession, include_deleted: bool = False) -> int:
         stmt = select(func.count(cls.model.id))
@@ -84,3 +134,207 @@ class BaseCRUD(Generic[T]):
             stmt = stmt.where(cls.model.deleted_at.is_(None))
         result = await db.execute(stmt)
         return result.scalar() or 0
+
+    @classmethod
+    async def approx_count(
+        cls, db: AsyncSession, include_deleted: bool = False
+    ) -> int:
+        """
+        Planner estimate of ``count(*)``, with the ``deleted_at IS NULL``
+        predicate unless ``include_deleted``. Constant time and never
+        scans the table, but only as fresh as the last ANALYZE/autovacuum.
+        """
+        sql = f"SELECT 1 FROM {cls.model.__tablename__}"
+        if not include_deleted:
+            sql += f" WHERE {LIVE_ROW_PREDICATE}"
+        plan = (await db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    @classmethod
+    async def cached_count(
+        cls,
+        db: AsyncSession,
+        include_deleted: bool = False,
+        max_age: float = base.COUNT_CACHE_SECONDS,
+    ) -> int:
+        """
+        Exact count served from a per-process cache.
+
+        A stale entry is returned as is while a background task refreshes
+        it on its own session, so callers never wait on ``count(*)``.
+        Until the first refresh of a process finishes the figure is only
+        the ``approx_count`` estimate (same predicate, but approximate).
+        """
+        key = (cls.model.__tablename__, include_deleted)
+        cached = cls._count_cache.get(key)
+        if cached is not None and time.monotonic() - cached[1] < max_age:
+            return cached[0]
+
+        if key not in cls._count_refreshing:
+            task = asyncio.create_task(cls._refresh_count(key, include_deleted))
+            cls._count_refreshing[key] = task
+            task.add_done_callback(
+                lambda _: cls._count_refreshing.pop(key, None)
+            )
+
+        if cached is not None:
+            return cached[0]
+        return await cls.approx_count(db, include_deleted)
+
+    @classmethod
+    async def _refresh_count(
+        cls,
+        key: tuple[str, bool],
+        include_deleted: bool,
+    ) -> None:
+        try:
+            async with sessionmanager.session() as db:
+                value = await cls.count(db, include_deleted=include_deleted)
+        except SQLAlchemyError:
+            logger.exception("count refresh failed",
+                             extra={"table": key[0]})
+            return
+        cls._count_cache[key] = (value, time.monotonic())
+
+    @classmethod
+    def _key_column(cls, keys: Sequence[Union[IDType, UUIDType]]):
+        """
+        Pick ``id`` or ``uuid`` depending on the kind of keys given.
+        Mixed lists are rejected rather than guessed.
+        """
+        if all(isinstance(k, UUIDType) for k in keys):
+            return cls.model.uuid
+        if all(isinstance(k, int) for k in keys):
+            return cls.model.id
+        raise ValueError("keys must be all ids or all uuids")
+
+    @classmethod
+    async def bulk_create(
+        cls,
+        db: AsyncSession,
+        rows: Sequence[dict[str, Any]],
+    ) -> List[T]:
+        """
+        Insert many rows with ``INSERT ... RETURNING`` batched by the
+        driver, instead of one add/flush/refresh cycle per object.
+        Python-side defaults (e.g. ``uuid``) are applied per row.
+        SQLAlchemy splits the batches below the bind parameter limit.
+        """
+        if not rows:
+            return []
+        result = await db.scalars(
+            insert(cls.model).returning(cls.model),
+            list(rows),
+        )
+        return list(result.all())
+
+    @classmethod
+    async def upsert(
+        cls,
+        db: AsyncSession,
+        rows: Sequence[dict[str, Any]],
+        conflict_columns: Sequence[str],
+        update_columns: Sequence[str] | None = None,
+    ) -> List[T]:
+        """
+        ``INSERT ... ON CONFLICT (conflict_columns) DO UPDATE`` for many rows.
+
+        Args:
+            conflict_columns: unique columns to match on,
+                e.g. ``["email"]`` for users or ``["title"]`` for products.
+            update_columns: columns overwritten on conflict; defaults to
+                every column present in the rows except the conflict
+                columns and the ones listed in ``UPSERT_PROTECTED``. An
+                empty list means ``DO NOTHING``: rows that already exist
+                are left alone and are *not* in the result, which then
+                holds only the rows inserted.
+
+        Rows go out in statements of at most ``MAX_BIND_PARAMS`` bind
+        parameters, all in the caller's transaction.
+        """
+        if not rows:
+            return []
+        rows = list(rows)
+        if update_columns is None:
+            present = {k for row in rows for k in row}
+            update_columns = [
+                c for c in present
+                if c not in conflict_columns and c not in UPSERT_PROTECTED
+            ]
+
+        per_statement = max(1, MAX_BIND_PARAMS // len(cls.model.__table__.columns))
+        result = []
+        for start in range(0, len(rows), per_statement):
+            result += await cls._upsert(
+                db, rows[start:start + per_statement],
+                conflict_columns, update_columns,
+            )
+        return result
+
+    @classmethod
+    async def _upsert(
+        cls,
+        db: AsyncSession,
+        rows: list[dict[str, Any]],
+        conflict_columns: Sequence[str],
+        update_columns: Sequence[str],
+    ) -> List[T]:
+        stmt = pg_insert(cls.model).values(rows)
+        set_ = {c: stmt.excluded[c] for c in update_columns}
+        if set_:
+            set_["modified_at"] = func.now()
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(conflict_columns), set_=set_
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(
+                index_elements=list(conflict_columns)
+            )
+
+        result = await db.scalars(
+            stmt.returning(cls.model),
+            execution_options={"populate_existing": True},
+        )
+        return list(result.all())
+
+    @classmethod
+    async def bulk_update(
+        cls,
+        db: AsyncSession,
+        keys: Sequence[Union[IDType, UUIDType]],
+        values: dict[str, Any],
+        include_deleted: bool = False,
+    ) -> int:
+        """
+        Apply the same ``values`` to every row whose id/uuid is in ``keys``
+        with a single UPDATE. Returns the number of rows changed.
+        """
+        if not keys or not values:
+            return 0
+        column = cls._key_column(keys)
+        stmt = (
+            update(cls.model)
+            .where(column.in_(list(keys)))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if not include_deleted:
+            stmt = stmt.where(cls.model.deleted_at.is_(None))
+        result = await db.execute(stmt)
+        return result.rowcount
+
+    @classmethod
+    async def bulk_soft_delete(
+        cls,
+        db: AsyncSession,
+        keys: Sequence[Union[IDType, UUIDType]],
+    ) -> int:
+        """
+        Set ``deleted_at`` on every live row whose id/uuid is in ``keys``.
+        Returns the number of rows deleted.
+        """
+        return await cls.bulk_update(
+            db, keys, {"deleted_at": func.now()}
+        )
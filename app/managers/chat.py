@@ -0,0 +1,6 @@
+from app.managers.base import BaseCRUD
+from app.models.chat import ChatMessage
+
+
+class ChatMessages(BaseCRUD[ChatMessage]):
+    model = ChatMessage
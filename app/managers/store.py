@@ -0,0 +1,22 @@
+from app.managers.base import BaseCRUD
+from app.models.store import Cart, CartItem, Product, ProductImage, ProductTombstone
+
+
+class Products(BaseCRUD[Product]):
+    model = Product
+
+
+class ProductImages(BaseCRUD[ProductImage]):
+    model = ProductImage
+
+
+class ProductTombstones(BaseCRUD[ProductTombstone]):
+    model = ProductTombstone
+
+
+class Carts(BaseCRUD[Cart]):
+    model = Cart
+
+
+class CartItems(BaseCRUD[CartItem]):
+    model = CartItem
@@ -0,0 +1,57 @@
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.metrics import registry
+from app.core.db.instrumentation import begin_request, end_request
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency from first byte in to last byte out.",
+    ["method", "route"],
+)
+http_responses = registry.counter(
+    "http_responses_total",
+    "HTTP responses sent.",
+    ["method", "route", "status"],
+)
+http_in_progress = registry.gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled.",
+    ["method"],
+)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware that times every HTTP request per route and
+    opens a per-request scope for the database instrumentation hooks.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        stats = begin_request(scope)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_progress.inc(method=method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_in_progress.dec(method=method)
+            route = stats.route
+            http_request_duration.observe(elapsed, method=method, route=route)
+            http_responses.inc(method=method, route=route, status=str(status))
+            end_request(stats)
@@ -1,13 +1,16 @@
 from .users import User
-from .store import Product, ProductImage, Review, DetailSell, Sell, Favorite, Cart, CartItem
+from .store import Product, ProductTombstone, ProductImage, Review, DetailSell, Sell, Favorite, Cart, CartItem
+from .chat import ChatMessage
 models_collection = (
     User,
     Product,
+    ProductTombstone,
     ProductImage,
     Review,
     DetailSell,
     Sell,
     Favorite,
     Cart,
-    CartItem
+    CartItem,
+    ChatMessage,
 )
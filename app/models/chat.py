@@ -0,0 +1,24 @@
+from sqlalchemy import ForeignKey, String, Text
+from sqlalchemy.types import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from app.core.db.model import Base, live_index
+
+
+class ChatMessage(Base):
+    room: Mapped[str] = mapped_column(String(120), nullable=False)
+
+    # uuid rather than id: the sender comes from the token claims, which
+    # carry no database id
+    user_uuid: Mapped[UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.uuid", ondelete="SET NULL"),
+        nullable=True,
+        index=True,
+    )
+
+    message: Mapped[str] = mapped_column(Text, nullable=False)
+
+    __table_args__ = (
+        # keyset order of the room history, which skips deleted messages
+        live_index("chat_messages", "room", "created_at", "id"),
+    )
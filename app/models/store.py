@@ -3,11 +3,13 @@ from datetime import datetime
 from app.core.db.model import Base
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Numeric, String, Boolean, ForeignKey, Integer, DateTime
+from sqlalchemy import Numeric, String, Boolean, ForeignKey, Integer, DateTime, Index
 
 
 class Product(Base):
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id"), nullable=False, index=True
+    )
 
     title: Mapped[str] = mapped_column(String(255), nullable=False, unique=True)
 
@@ -22,18 +24,45 @@ class Product(Base):
 
     user: Mapped["User"] = relationship("User", back_populates="products")
 
+    # Rows are removed by ON DELETE CASCADE in the database, so deleting
+    # a product never loads its images or reviews.
     images: Mapped[list["ProductImage"]] = relationship(
-        "ProductImage", back_populates="product", cascade="all, delete-orphan"
+        "ProductImage",
+        back_populates="product",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     reviews: Mapped[list["Review"]] = relationship(
-        "Review", back_populates="product", cascade="all, delete-orphan"
+        "Review",
+        back_populates="product",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    __table_args__ = (
+        # keyset order of the /products/changes feed
+        Index("ix_products_modified_at_id", "modified_at", "id"),
+    )
+
+
+class ProductTombstone(Base):
+    """
+    A hard-deleted product, kept for the changes feed. ``uuid`` is the
+    deleted product's uuid and ``created_at`` the time of the delete.
+    """
+    # No foreign key: the product row is gone
+    product_id: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (
+        # keyset order of the /products/changes feed
+        Index("ix_product_tombstones_created_at_product_id", "created_at", "product_id"),
     )
 
 
 class ProductImage(Base):
     product_id: Mapped[int] = mapped_column(
-        ForeignKey("products.id", ondelete="CASCADE"), nullable=False
+        ForeignKey("products.id", ondelete="CASCADE"), nullable=False, index=True
     )
 
     path: Mapped[str] = mapped_column(String(300), nullable=False)
@@ -48,10 +77,12 @@ class Review(Base):
     comment: Mapped[str] = mapped_column(String(600), nullable=False)
 
     product_id: Mapped[int] = mapped_column(
-        ForeignKey("products.id"), nullable=False
+        ForeignKey("products.id", ondelete="CASCADE"), nullable=False, index=True
     )
 
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id"), nullable=False, index=True
+    )
 
     product: Mapped["Product"] = relationship("Product", back_populates="reviews")
 
@@ -59,10 +90,12 @@ class Review(Base):
 
 
 class DetailSell(Base):
-    sell_id: Mapped[int] = mapped_column(ForeignKey("sells.id"), nullable=False)
+    sell_id: Mapped[int] = mapped_column(
+        ForeignKey("sells.id"), nullable=False, index=True
+    )
 
     product_id: Mapped[int] = mapped_column(
-        ForeignKey("products.id"), nullable=False
+        ForeignKey("products.id"), nullable=False, index=True
     )
 
     qty: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
@@ -73,7 +106,9 @@ class DetailSell(Base):
 
 
 class Sell(Base):
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id"), nullable=False, index=True
+    )
 
     total: Mapped[Decimal] = mapped_column(Numeric(12, 2), nullable=False)
 
@@ -91,9 +126,11 @@ class Sell(Base):
 
 
 class Favorite(Base):
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id"), nullable=False, index=True
+    )
     product_id: Mapped[int] = mapped_column(
-        ForeignKey("products.id"), nullable=False
+        ForeignKey("products.id", ondelete="CASCADE"), nullable=False, index=True
     )
 
     user: Mapped["User"] = relationship("User", back_populates="favorites")
@@ -114,10 +151,12 @@ class Cart(Base):
 
 
 class CartItem(Base):
-    cart_id: Mapped[int] = mapped_column(ForeignKey("carts.id"), nullable=False)
+    cart_id: Mapped[int] = mapped_column(
+        ForeignKey("carts.id"), nullable=False, index=True
+    )
 
     product_id: Mapped[int] = mapped_column(
-        ForeignKey("products.id"), nullable=False
+        ForeignKey("products.id", ondelete="CASCADE"), nullable=False, index=True
     )
 
     qty: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
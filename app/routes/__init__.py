@@ -3,16 +3,29 @@ from fastapi import APIRouter, FastAPI
 from app.routes.ws.chat import chat_routes
 from app.routes.http.auth import auth_routes
 from app.routes.http.user import user_routes
+from app.routes.http.admin import admin_routes
 from app.routes.http.store import store_routes
+from app.routes.http.presence import presence_routes
+from app.routes.http.chat import chat_history_routes
+from app.routes.http.cart import cart_routes
+from app.routes.http.metrics import metrics_routes
 
 
-h_routers: list[APIRouter] = [auth_routes, user_routes, store_routes]
+h_routers: list[APIRouter] = [
+    auth_routes, user_routes, store_routes, admin_routes, presence_routes,
+    chat_history_routes, cart_routes,
+]
 
 w_routers: list[APIRouter] = [chat_routes]
 
+# Unversioned, mounted at the application root
+r_routers: list[APIRouter] = [metrics_routes]
+
 
 def load_routes(app: FastAPI):
     for r in h_routers:
         app.include_router(router=r, prefix=f"/api/v{base.APP_VERSION}")
     for r in w_routers:
         app.include_router(router=r, prefix=f"/ws/v{base.APP_VERSION}")
+    for r in r_routers:
+        app.include_router(router=r)
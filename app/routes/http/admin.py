@@ -0,0 +1,62 @@
+"""
+Collection of all the
+``` HTTP
+/api/v{x}/admin
+```
+routes
+"""
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.dependencies.auth import basic_permission_dependency
+from app.core.db.sessionmanager import get_session
+from app.schemas.users import UserPage
+from app.managers.store import Products
+from app.managers.users import Users
+from app.models.users import User
+
+
+admin_routes = APIRouter(prefix="/admin", tags=["Admin"])
+
+admin_only = basic_permission_dependency(
+    [User.BaseUserRole.ADMIN, User.BaseUserRole.STAFF]
+)
+
+
+@admin_routes.get("/users", response_model=UserPage)
+async def list_users(
+    after: int | None = Query(None, description="id of the last user seen"),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_session),
+    _: User = Depends(admin_only),
+):
+    users = await Users.get_page(db, after=after, limit=limit)
+    return {
+        "items": users,
+        "next_after": users[-1].id if len(users) == limit else None,
+        "total": await Users.cached_count(db),
+    }
+
+
+@admin_routes.get("/products")
+async def list_products(
+    after: int | None = Query(None, description="id of the last product seen"),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_session),
+    _: User = Depends(admin_only),
+):
+    products = await Products.get_page(db, after=after, limit=limit)
+    return {
+        "items": [
+            {
+                "id": p.id,
+                "uuid": str(p.uuid),
+                "title": p.title,
+                "price": str(p.price),
+                "user_id": p.user_id,
+                "created_at": p.created_at,
+            }
+            for p in products
+        ],
+        "next_after": products[-1].id if len(products) == limit else None,
+        "total": await Products.cached_count(db),
+    }
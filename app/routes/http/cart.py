@@ -0,0 +1,112 @@
+"""
+Collection of all the
+``` HTTP
+/api/v{x}/cart
+```
+routes
+"""
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from app.core.db.sessionmanager import get_session
+from app.dependencies.auth import basic_permission_dependency
+from app.models.store import Product
+from app.models.users import User
+from app.schemas.store import CartItemQty
+from app.utils.cart import CartFull, carts
+from app.utils.store import load_images, serialize_product
+
+
+cart_routes = APIRouter(prefix="/cart", tags=["Cart"])
+
+
+@cart_routes.get("")
+async def get_cart(
+    db: AsyncSession = Depends(get_session),
+    user: User = Depends(basic_permission_dependency([])),
+):
+    """
+    The cart with product details, resolved with one query for the
+    products and one for their images. Products deleted since they were
+    added are dropped from the cart.
+    """
+    items = await carts.get(db, user.id)
+    if not items:
+        return {"items": [], "count": 0}
+
+    uuids = bindparam(
+        "uuids", value=list(items), type_=ARRAY(PG_UUID(as_uuid=True))
+    )
+    products = list((await db.scalars(
+        select(Product)
+        .where(Product.uuid == any_(uuids), Product.deleted_at.is_(None))
+        .options(joinedload(Product.user))
+    )).all())
+    await load_images(db, products)
+
+    found = {p.uuid: p for p in products}
+    await carts.discard(user.id, [u for u in items if u not in found])
+    return {
+        "items": [
+            {"product": serialize_product(found[u]), "qty": qty}
+            for u, qty in items.items()
+            if u in found
+        ],
+        "count": sum(qty for u, qty in items.items() if u in found),
+    }
+
+
+async def _update(
+    db: AsyncSession,
+    user: User,
+    product_uuid: UUID,
+    qty: int,
+    add: bool = False,
+) -> dict:
+    try:
+        qty = await carts.set(db, user.id, product_uuid, qty, add=add)
+    except CartFull as e:
+        raise HTTPException(409, str(e))
+    return {"product": str(product_uuid), "qty": qty}
+
+
+@cart_routes.put("/items/{product_uuid}")
+async def set_cart_item(
+    product_uuid: UUID,
+    data: CartItemQty,
+    db: AsyncSession = Depends(get_session),
+    user: User = Depends(basic_permission_dependency([])),
+):
+    """Set the qty of a product; 0 removes it."""
+    return await _update(db, user, product_uuid, data.qty)
+
+
+@cart_routes.post("/items/{product_uuid}")
+async def add_cart_item(
+    product_uuid: UUID,
+    data: CartItemQty,
+    db: AsyncSession = Depends(get_session),
+    user: User = Depends(basic_permission_dependency([])),
+):
+    """Add ``qty`` to whatever is already in the cart for this product."""
+    return await _update(db, user, product_uuid, data.qty, add=True)
+
+
+@cart_routes.delete("/items/{product_uuid}")
+async def remove_cart_item(
+    product_uuid: UUID,
+    db: AsyncSession = Depends(get_session),
+    user: User = Depends(basic_permission_dependency([])),
+):
+    return await _update(db, user, product_uuid, 0)
+
+
+@cart_routes.delete("")
+async def clear_cart(
+    user: User = Depends(basic_permission_dependency([])),
+):
+    await carts.clear(user.id)
+    return {"items": [], "count": 0}
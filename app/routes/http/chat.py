@@ -0,0 +1,60 @@
+"""
+Collection of all the
+``` HTTP
+/api/v{x}/chat
+```
+routes
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.db.sessionmanager import get_session
+from app.core.ws import room_channel
+from app.models.chat import ChatMessage
+from app.schemas.chat import ChatHistoryPage
+from app.utils.sync import decode_cursor, encode_cursor
+
+
+chat_history_routes = APIRouter(prefix="/chat", tags=["Chat"])
+
+
+@chat_history_routes.get("/{room}/history", response_model=ChatHistoryPage)
+async def room_history(
+    room: str,
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_session),
+):
+    """
+    Messages of ``room``, newest first, by keyset on
+    ``(room, created_at, id)``. Pass ``next_cursor`` back to page further
+    into the past. Messages still in the write-behind buffer (up to
+    ``CHAT_HISTORY_FLUSH_MS``) are not listed yet.
+    """
+    try:
+        room_channel(room)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    stmt = (
+        select(ChatMessage)
+        .where(ChatMessage.room == room.lower(), ChatMessage.deleted_at.is_(None))
+        .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+        .limit(limit)
+    )
+    if cursor:
+        try:
+            before_ts, before_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(400, "Invalid cursor")
+        stmt = stmt.where(
+            tuple_(ChatMessage.created_at, ChatMessage.id)
+            < tuple_(before_ts, before_id)
+        )
+
+    messages = list((await db.scalars(stmt)).all())
+    last = messages[-1] if len(messages) == limit else None
+    return {
+        "items": messages,
+        "next_cursor": encode_cursor(last.created_at, last.id) if last else None,
+    }
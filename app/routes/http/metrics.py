@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Response
+from app.config import base
+from app.core.metrics import registry, read_snapshots, snapshots, CONTENT_TYPE
+
+
+metrics_routes = APIRouter(tags=["Metrics"])
+
+
+@metrics_routes.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """Summed over every worker when ``METRICS_DIR`` is set."""
+    if not snapshots.enabled:
+        return Response(content=registry.render(), media_type=CONTENT_TYPE)
+    # This worker's own numbers up to date, the others' within
+    # METRICS_SYNC_SECONDS
+    snapshots.write()
+    content = registry.render(read_snapshots(base.METRICS_DIR))
+    return Response(content=content, media_type=CONTENT_TYPE)
@@ -0,0 +1,31 @@
+"""
+Collection of all the
+``` HTTP
+/api/v{x}/presence
+```
+routes
+"""
+from fastapi import APIRouter, Depends
+from app.core.ws import presence
+from app.dependencies.auth import basic_permission_dependency
+from app.routes.http.admin import admin_only
+from app.schemas.users import NodePresence, PresenceQuery
+from app.models.users import User
+
+
+presence_routes = APIRouter(prefix="/presence", tags=["Presence"])
+
+
+@presence_routes.post("/users", response_model=dict[str, bool])
+async def users_online(
+    query: PresenceQuery,
+    _: User = Depends(basic_permission_dependency([])),
+):
+    """Online flag for each requested user uuid."""
+    return await presence.online([str(u) for u in query.uuids])
+
+
+@presence_routes.get("/nodes", response_model=list[NodePresence])
+async def node_connections(_: User = Depends(admin_only)):
+    """Websocket connections held by each live node."""
+    return await presence.nodes()
@@ -2,4 +2,5 @@ from fastapi import APIRouter
 
 store_routes = APIRouter(prefix="/store", tags=["Store"])
 
-from .products import *
\ No newline at end of file
+from .products import *
+from .imports import *
\ No newline at end of file
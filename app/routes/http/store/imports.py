@@ -0,0 +1,78 @@
+import shutil
+import asyncio
+import tempfile
+from pathlib import Path
+from typing import AsyncIterator
+from fastapi import BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.dependencies.auth import basic_permission_dependency
+from app.core.db.sessionmanager import get_session, sessionmanager
+from app.core.ws import notify_user
+from app.routes.http.store import store_routes
+from app.models.users import User
+from app.utils.product_import import (
+    PendingImages,
+    detect_format,
+    import_products,
+    process_import_images,
+)
+
+CHUNK_SIZE = 64 * 1024
+
+
+async def read_chunks(file: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await file.read(CHUNK_SIZE):
+        yield chunk
+
+
+def _save_archive(archive: UploadFile) -> Path:
+    with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as tmp:
+        shutil.copyfileobj(archive.file, tmp)
+        return Path(tmp.name)
+
+
+async def import_images_task(
+    user_uuid: str,
+    pending: list[PendingImages],
+    archive_path: Path | None,
+) -> None:
+    try:
+        async with sessionmanager.session() as db:
+            failed = await process_import_images(db, pending, archive_path)
+    finally:
+        if archive_path is not None:
+            archive_path.unlink(missing_ok=True)
+    await notify_user(user_uuid, {
+        "type": "product_import.images",
+        "processed": sum(len(p.refs) for p in pending),
+        "failed": failed,
+    })
+
+
+@store_routes.post("/products/import")
+async def import_products_file(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(..., description="CSV or NDJSON, one product per row"),
+    format: str | None = Form(None, description="csv | ndjson, defaults to the file extension"),
+    archive: UploadFile | None = File(None, description="zip with the images referenced by path"),
+    db: AsyncSession = Depends(get_session),
+    user: User = Depends(basic_permission_dependency([])),
+):
+    try:
+        fmt = detect_format(file.filename, format)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    report = await import_products(
+        db=db, user_id=user.id, chunks=read_chunks(file), fmt=fmt
+    )
+
+    if report.images:
+        archive_path = (
+            await asyncio.to_thread(_save_archive, archive) if archive else None
+        )
+        background_tasks.add_task(
+            import_images_task, str(user.uuid), report.images, archive_path
+        )
+
+    return report.as_dict()
@@ -1,19 +1,32 @@
-from fastapi import File, UploadFile, Form, Depends, HTTPException
+from fastapi import File, UploadFile, Form, Depends, HTTPException, Query
 from app.dependencies.auth import basic_permission_dependency
-from app.models.store import Product, ProductImage, Review
+from app.models.store import Product, ProductImage, ProductTombstone, Review
 from app.core.db.sessionmanager import get_session
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.exc import IntegrityError
 from app.routes.http.store import store_routes
-from app.utils.store import serialize_product
+from app.utils.store import serialize_product, load_images, review_stats_columns
+from app.utils.sync import decode_cursor, encode_cursor, tombstone_horizon
 from app.utils import media as media_utils
 from app.config.base import MEDIA_PRODUCTS
+from app.managers.store import ProductImages, ProductTombstones
+from app.schemas.store import ProductUUIDList
 from sqlalchemy.orm import joinedload
 from app.models.users import User
-from sqlalchemy import select, func
-from decimal import Decimal
+from sqlalchemy import select, func, text, update, delete, any_, bindparam, tuple_
+from app.config import base
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from decimal import Decimal, InvalidOperation
+from pydantic import TypeAdapter, ValidationError
 from uuid import UUID
+from typing import Sequence
+import asyncio
+import logging
 import json
 
+logger = logging.getLogger(__name__)
+
 
 @store_routes.get("/products/store/")
 async def list_my_products(
@@ -51,8 +64,9 @@ async def list_my_products(
         ]
 
         return products
-    except Exception as e:
-        print(e)
+    except Exception:
+        logger.exception("failed to list store products",
+                         extra={"user_id": user.id})
     return []
 
 
@@ -83,6 +97,180 @@ async def list_products(db: AsyncSession = Depends(get_session)):
     ]
 
 
+@store_routes.post("/products/batch")
+async def get_products_batch(
+    data: ProductUUIDList,
+    db: AsyncSession = Depends(get_session),
+):
+    """
+    Resolve many products at once: one ``uuid = ANY(:uuids)`` query with
+    per-product review stats, plus one query for all their images.
+    """
+    review_count, review_avg = review_stats_columns()
+    uuids = bindparam(
+        "uuids", value=data.uuids, type_=ARRAY(PG_UUID(as_uuid=True))
+    )
+    stmt = (
+        select(Product, review_count, review_avg)
+        .where(Product.uuid == any_(uuids), Product.deleted_at.is_(None))
+        .options(joinedload(Product.user))
+    )
+    rows = (await db.execute(stmt)).all()
+    await load_images(db, [p for p, _, _ in rows])
+
+    found = {
+        str(p.uuid): serialize_product(
+            p,
+            review_count=rc or 0,
+            review_avg=float(ra) if ra is not None else None
+        )
+        for p, rc, ra in rows
+    }
+    return {
+        "products": found,
+        "missing": [str(u) for u in data.uuids if str(u) not in found],
+    }
+
+
+# Changes before this are final: at least :lag seconds old, and older
+# than every open transaction of this role, the one that writes
+# products. Every row such a transaction writes carries now() = its
+# start time. Transactions open for longer than :max_hold are ignored so
+# that one left idle cannot stall the feed.
+FEED_WATERMARK = text("""
+SELECT least(
+    now() - make_interval(secs => :lag),
+    (SELECT min(xact_start) FROM pg_stat_activity
+     WHERE datname = current_database()
+       AND usename = current_user
+       AND backend_type = 'client backend'
+       AND pid <> pg_backend_pid()
+       AND xact_start > now() - make_interval(secs => :max_hold))
+)
+""")
+
+
+@store_routes.get("/products/changes")
+async def product_changes(
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(200, ge=1, le=1000),
+    db: AsyncSession = Depends(get_session),
+):
+    """
+    Products created, modified or deleted after ``cursor``, ordered by
+    ``(modified_at, id)``. Deleted products come back as tombstones.
+    Start without a cursor for a full sync, then keep passing the
+    returned ``next_cursor``. Tombstones are kept for
+    ``PRODUCT_TOMBSTONE_RETENTION_DAYS``; a cursor older than that gets
+    410 and the client has to start over without one. An empty page
+    still advances the cursor, so a client that polls more often than
+    that never has to.
+
+    Rows are only listed once no transaction that started before them
+    is still open, and at least ``PRODUCT_CHANGES_LAG_SECONDS`` old, so
+    a slow transaction that commits late with an older ``modified_at``
+    is never skipped by the cursor. Transactions are only waited for up
+    to ``PRODUCT_CHANGES_MAX_HOLD_SECONDS``; the app's connections abort
+    an idle transaction well before that, so none that old commits.
+    """
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(400, "Invalid cursor")
+        if after[0] < tombstone_horizon():
+            raise HTTPException(410, "Cursor expired, sync again without one")
+
+    watermark = (await db.execute(FEED_WATERMARK, {
+        "lag": base.PRODUCT_CHANGES_LAG_SECONDS,
+        "max_hold": base.PRODUCT_CHANGES_MAX_HOLD_SECONDS,
+    })).scalar_one()
+
+    review_count, review_avg = review_stats_columns()
+    stmt = (
+        select(Product, review_count, review_avg)
+        .where(Product.modified_at < watermark)
+        .order_by(Product.modified_at, Product.id)
+        .limit(limit + 1)
+        .options(joinedload(Product.user))
+    )
+    tombstones = (
+        select(ProductTombstone)
+        .where(ProductTombstone.created_at < watermark)
+        .order_by(ProductTombstone.created_at, ProductTombstone.product_id)
+        .limit(limit + 1)
+    )
+    if after is not None:
+        stmt = stmt.where(
+            tuple_(Product.modified_at, Product.id) > tuple_(*after)
+        )
+        tombstones = tombstones.where(
+            tuple_(ProductTombstone.created_at, ProductTombstone.product_id)
+            > tuple_(*after)
+        )
+
+    # (modified_at, id, change); a deleted product's id never comes back,
+    # so both sources share one keyset
+    merged = [
+        (p.modified_at, p.id, (p, rc, ra))
+        for p, rc, ra in (await db.execute(stmt)).all()
+    ] + [
+        (t.created_at, t.product_id, t)
+        for t in await db.scalars(tombstones)
+    ]
+    merged.sort(key=lambda m: m[:2])
+    has_more = len(merged) > limit
+    merged = merged[:limit]
+
+    live = [
+        m[2][0] for m in merged
+        if isinstance(m[2], tuple) and m[2][0].deleted_at is None
+    ]
+    await load_images(db, live)
+
+    changes = []
+    for _, _, change in merged:
+        if isinstance(change, ProductTombstone):
+            changes.append({
+                "uuid": str(change.uuid),
+                "deleted": True,
+                "deleted_at": change.created_at,
+            })
+            continue
+        p, rc, ra = change
+        if p.deleted_at is not None:
+            changes.append({
+                "uuid": str(p.uuid),
+                "deleted": True,
+                "deleted_at": p.deleted_at,
+            })
+            continue
+        changes.append({
+            **serialize_product(
+                p,
+                review_count=rc or 0,
+                review_avg=float(ra) if ra is not None else None
+            ),
+            "deleted": False,
+            "modified_at": p.modified_at,
+        })
+
+    if merged:
+        next_cursor = encode_cursor(*merged[-1][:2])
+    elif after is None or after < (watermark, 0):
+        # Caught up: everything before the watermark has been seen, so
+        # move the cursor along and keep it from expiring while idle
+        next_cursor = encode_cursor(watermark, 0)
+    else:
+        next_cursor = cursor
+    return {
+        "changes": changes,
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+    }
+
+
 @store_routes.get("/products/{product_uuid}")
 async def get_product(product_uuid: UUID, db: AsyncSession = Depends(get_session)):
     review_stats = (
@@ -238,29 +426,237 @@ async def update_product(
     return serialize_product(product)
 
 
+async def ownership_error(db: AsyncSession, product_uuid: UUID) -> HTTPException:
+    """
+    Tell apart "missing" from "not yours" after an owner-scoped
+    statement matched nothing. Only runs on the failure path.
+    """
+    exists = await db.scalar(
+        select(Product.id).where(
+            Product.uuid == product_uuid, Product.deleted_at.is_(None)
+        )
+    )
+    if exists is None:
+        return HTTPException(404, "Product not found")
+    return HTTPException(403, "Forbidden")
+
+
+STR_LIST = TypeAdapter(list[str])
+
+
+def str_list_form(raw: str, field: str) -> list[str]:
+    """Parse a form field holding a JSON list of strings, or fail with 400."""
+    try:
+        return STR_LIST.validate_json(raw)
+    except ValidationError:
+        raise HTTPException(400, f"{field} must be a JSON list of strings")
+
+
+@store_routes.patch("/products/{product_uuid}")
+async def patch_product(
+    product_uuid: UUID,
+    title: str | None = Form(None),
+    price: str | None = Form(None),
+    description: str | None = Form(None),
+    discount: str | None = Form(None),
+    free_shipping: bool | None = Form(None),
+    specs: str | None = Form(None),
+    remove_images: str | None = Form(
+        None, description="JSON list of secondary image uuids to delete"
+    ),
+
+    primary_image: UploadFile | None = File(None),
+    optional_1: UploadFile | None = File(None),
+    optional_2: UploadFile | None = File(None),
+    optional_3: UploadFile | None = File(None),
+    optional_4: UploadFile | None = File(None),
+
+    db: AsyncSession = Depends(get_session),
+    user: User = Depends(basic_permission_dependency([])),
+):
+    """
+    Partial update applied with a single
+    ``UPDATE ... WHERE uuid = :u AND user_id = :me RETURNING``,
+    so ownership is checked by the same statement. Images are changed
+    with targeted deletes/inserts and reviews are never loaded.
+
+    Uploads are converted before the UPDATE so the row lock is not held
+    meanwhile; the files of removed and replaced images are deleted once
+    the change is committed.
+    """
+    values: dict = {}
+    if title is not None: values["title"] = title
+    if description is not None: values["description"] = description
+    if free_shipping is not None: values["free_shipping"] = free_shipping
+
+    try:
+        if price is not None: values["price"] = Decimal(price)
+        if discount is not None: values["discount"] = Decimal(discount)
+    except InvalidOperation:
+        raise HTTPException(400, "Invalid price or discount")
+
+    if specs is not None:
+        values["specs"] = str_list_form(specs, "specs")
+    try:
+        removed = [
+            UUID(u) for u in str_list_form(remove_images or "[]", "remove_images")
+        ]
+    except ValueError:
+        raise HTTPException(400, "remove_images must hold image uuids")
+
+    uploads = [(primary_image, True)] + [
+        (upload, False)
+        for upload in [optional_1, optional_2, optional_3, optional_4]
+    ]
+    rows = []
+    try:
+        for upload, primary in uploads:
+            if not upload:
+                continue
+            filename = await asyncio.to_thread(
+                media_utils.process_image, upload, MEDIA_PRODUCTS
+            )
+            rows.append({
+                "path": f"/media/products/{filename}",
+                "is_primary": primary,
+            })
+        product, dropped = await apply_patch(
+            db, user, product_uuid, values, removed,
+            replace_primary=bool(primary_image), new_images=rows,
+        )
+    except BaseException:
+        # Nothing refers to the converted uploads
+        media_utils.remove_files([r["path"] for r in rows], MEDIA_PRODUCTS)
+        raise
+
+    media_utils.remove_files(dropped, MEDIA_PRODUCTS)
+    return serialize_product(product)
+
+
+async def apply_patch(
+    db: AsyncSession,
+    user: User,
+    product_uuid: UUID,
+    values: dict,
+    removed: list[UUID],
+    replace_primary: bool,
+    new_images: list[dict],
+) -> tuple[Product, list[str]]:
+    """
+    Update the product and its images and commit. Returns the product
+    and the paths of the images it no longer has.
+    """
+    # modified_at is always bumped so image-only changes are visible too
+    stmt = (
+        update(Product)
+        .where(
+            Product.uuid == product_uuid,
+            Product.user_id == user.id,
+            Product.deleted_at.is_(None),
+        )
+        .values(**values, modified_at=func.now())
+        .returning(Product)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        product = (await db.execute(stmt)).scalar_one_or_none()
+    except IntegrityError:
+        raise HTTPException(409, "A product with that title already exists")
+    if product is None:
+        raise await ownership_error(db, product_uuid)
+
+    dropped = []
+    if removed:
+        dropped += await db.scalars(
+            delete(ProductImage)
+            .where(
+                ProductImage.product_id == product.id,
+                ProductImage.uuid.in_(removed),
+                ProductImage.is_primary.is_(False),
+            )
+            .returning(ProductImage.path)
+        )
+    if replace_primary:
+        dropped += await db.scalars(
+            delete(ProductImage)
+            .where(
+                ProductImage.product_id == product.id,
+                ProductImage.is_primary.is_(True),
+            )
+            .returning(ProductImage.path)
+        )
+    await ProductImages.bulk_create(
+        db, [{**row, "product_id": product.id} for row in new_images]
+    )
+
+    await load_images(db, [product])
+    set_committed_value(product, "user", user)
+    await db.commit()
+    return product, dropped
+
+
+async def record_tombstones(
+    db: AsyncSession, deleted: Sequence[tuple[int, UUID]]
+) -> None:
+    """Leave a tombstone for the changes feed per deleted ``(id, uuid)``."""
+    await ProductTombstones.bulk_create(db, [
+        {"product_id": product_id, "uuid": product_uuid}
+        for product_id, product_uuid in deleted
+    ])
+
+
 @store_routes.delete("/products/{product_uuid}")
 async def delete_product(
     product_uuid: UUID,
     db: AsyncSession = Depends(get_session),
     user: User = Depends(basic_permission_dependency([])),
 ):
+    # Images, reviews, favorites and cart items go with ON DELETE CASCADE
     stmt = (
-        select(Product)
-        .where(Product.uuid == product_uuid)
+        delete(Product)
+        .where(Product.uuid == product_uuid, Product.user_id == user.id)
+        .returning(Product.id, Product.uuid)
+        .execution_options(synchronize_session=False)
     )
-    result = await db.execute(stmt)
-    product = result.unique().scalar_one_or_none()
-    if not product:
-        raise HTTPException(404, "Not found")
-
-    if product.user_id != user.id:
-        raise HTTPException(403, "Forbidden")
+    try:
+        deleted = (await db.execute(stmt)).all()
+    except IntegrityError:
+        raise HTTPException(409, "Product has sales and cannot be deleted")
+    if not deleted:
+        raise await ownership_error(db, product_uuid)
 
-    await db.delete(product)
+    await record_tombstones(db, deleted)
     await db.commit()
     return {"status": "deleted"}
 
 
+@store_routes.post("/products/bulk-delete")
+async def bulk_delete_products(
+    data: ProductUUIDList,
+    db: AsyncSession = Depends(get_session),
+    user: User = Depends(basic_permission_dependency([])),
+):
+    stmt = (
+        delete(Product)
+        .where(Product.uuid.in_(data.uuids), Product.user_id == user.id)
+        .returning(Product.id, Product.uuid)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        rows = (await db.execute(stmt)).all()
+    except IntegrityError:
+        raise HTTPException(
+            409, "Some products have sales and cannot be deleted"
+        )
+    await record_tombstones(db, rows)
+    await db.commit()
+    deleted = {product_uuid for _, product_uuid in rows}
+    return {
+        "deleted": [str(u) for u in data.uuids if u in deleted],
+        "missing": [str(u) for u in data.uuids if u not in deleted],
+    }
+
+
 @store_routes.delete("/products/{product_uuid}/image/{image_uuid}")
 async def delete_image(
     product_uuid: UUID,
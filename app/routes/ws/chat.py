@@ -1,7 +1,31 @@
 import json
-import asyncio
+import time
+import uuid
 from typing import List
-from app.core.ws import ProtectedWebSocket, broadcaster
+from datetime import datetime, timezone
+from app.config import base
+from app.core.metrics import registry
+from app.utils.ratelimit import RedisTokenBucket, TokenBucket
+from app.core.db.redis import redis_client
+from app.utils.chat_history import chat_history
+from app.core.ws import (
+    CLOSE_MESSAGE_TOO_BIG,
+    CLOSE_POLICY_VIOLATION,
+    CLOSE_SERVICE_RESTART,
+    DEFAULT_ROOM,
+    PayloadTooLarge,
+    ProtectedWebSocket,
+    Unsubscribed,
+    broadcaster,
+    negotiate_protocol,
+    presence,
+    room_channel,
+    close_socket,
+    serve_until_closed,
+    sockets,
+    stream_id_key,
+    user_channel,
+)
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
 chat_routes = APIRouter(
@@ -9,34 +33,171 @@ chat_routes = APIRouter(
     tags=["Chat"]
 )
 
+# What happens to messages over the rate or size limit
+FLOOD_DROP = "drop"
+FLOOD_DISCONNECT = "disconnect"
+FLOOD_POLICIES = (FLOOD_DROP, FLOOD_DISCONNECT)
+
+if base.WS_FLOOD_POLICY not in FLOOD_POLICIES:
+    raise ValueError(f"WS_FLOOD_POLICY must be one of {FLOOD_POLICIES}")
+
+# With the drop policy a flooding client is told at most this often;
+# one error frame per dropped message would echo the flood back
+FLOOD_NOTICE_SECONDS = 1.0
+
+# Shared by all sockets of a user, on every worker and node
+user_buckets = RedisTokenBucket(
+    redis_client,
+    base.WS_USER_RATE_PER_SECOND,
+    base.WS_USER_RATE_BURST,
+    prefix="ratelimit:ws:user",
+)
+
+ws_messages_rejected = registry.counter(
+    "ws_messages_rejected_total",
+    "Inbound chat messages over the rate or size limit.",
+    ["reason", "policy"],
+)
+
 
 @chat_routes.websocket("/")
 async def main_chat(ws: WebSocket):
-    # ws_session = ProtectedWebSocket(ws)
-    # await ws_session.accept()
-    await ws.accept()
-    
+    await serve_chat(ws, DEFAULT_ROOM)
+
+
+@chat_routes.websocket("/{room}")
+async def room_chat(ws: WebSocket, room: str):
+    """
+    Chat scoped to one room, e.g. ``store:<uuid>`` or ``product:<uuid>``.
+    Only nodes with members in the room subscribe to its channel.
+    """
+    await serve_chat(ws, room)
+
+
+async def serve_chat(ws: WebSocket, room: str):
+    if sockets.draining:
+        await ws.close(CLOSE_SERVICE_RESTART)
+        return
+    try:
+        channel = room_channel(room)
+    except ValueError:
+        await ws.close(1008)
+        return
+    # Same room whatever the case of the uuid, as in room_channel
+    room = room.lower()
+
+    # Clients resuming after a reconnect pass the last id they received;
+    # only backends that keep history (redis+streams) can replay. A
+    # {"type": "gap"} frame first means not everything could be, and the
+    # client should reload the room history instead.
+    last_event_id = ws.query_params.get("last_event_id")
+    if last_event_id is not None:
+        try:
+            stream_id_key(last_event_id)
+        except ValueError:
+            await ws.close(1008)
+            return
+
+    protocol = negotiate_protocol(ws)
+    session = ProtectedWebSocket(ws)
+    try:
+        await session.accept(subprotocol=protocol.subprotocol)
+    except WebSocketDisconnect:
+        return
+
+    conn_bucket = TokenBucket(base.WS_RATE_PER_SECOND, base.WS_RATE_BURST)
+    notified_at = float("-inf")
+
+    async def reject(reason: str, code: int) -> None:
+        nonlocal notified_at
+        ws_messages_rejected.inc(reason=reason, policy=base.WS_FLOOD_POLICY)
+        if base.WS_FLOOD_POLICY == FLOOD_DISCONNECT:
+            await close_socket(ws, code, reason)
+            raise WebSocketDisconnect(code)
+        now = time.monotonic()
+        if now - notified_at < FLOOD_NOTICE_SECONDS:
+            return
+        notified_at = now
+        await ws.send_json({
+            "type": "error",
+            "payload": {"code": 429, "message": f"Message dropped: {reason}"},
+        })
+
+    async def allowed() -> bool:
+        # The connection's bucket is only drawn from once the user's
+        # granted the message, so one limit rejecting does not use up
+        # the other
+        if not conn_bucket.available():
+            return False
+        if session.user_uuid is not None and not await user_buckets.take(session.user_uuid):
+            return False
+        return conn_bucket.take()
+
     async def receive_loop():
         try:
             while True:
-                data = await ws.receive_json()
+                try:
+                    data = await protocol.receive(ws)
+                except PayloadTooLarge:
+                    sockets.touch(ws)
+                    await reject("payload too large", CLOSE_MESSAGE_TOO_BIG)
+                    continue
+                sockets.touch(ws)
+                if data.get("type") == "pong":
+                    continue
                 # validate incoming message
                 if data.get("type") != "message" or not isinstance(data.get("message"), str):
                     raise WebSocketDisconnect
-                await broadcaster.publish("chat", "data")
+                # Checked before publishing: every message is multiplied
+                # by the subscriber count on every node
+                if not await allowed():
+                    await reject("rate limited", CLOSE_POLICY_VIOLATION)
+                    continue
+                message_uuid = uuid.uuid4()
+                sent_at = datetime.now(timezone.utc)
+                # Encoded once here; every subscriber gets the same string
+                payload = json.dumps({
+                    "type": "message",
+                    "uuid": str(message_uuid),
+                    "room": room,
+                    "user": session.user_uuid,
+                    "message": data["message"],
+                    "created_at": sent_at.isoformat(),
+                })
+                await broadcaster.publish(channel, payload)
+                if base.CHAT_HISTORY_ENABLED:
+                    chat_history.add({
+                        "uuid": message_uuid,
+                        "room": room,
+                        "user_uuid": uuid.UUID(session.user_uuid) if session.user_uuid else None,
+                        "message": data["message"],
+                        "created_at": sent_at,
+                    })
         except (ValueError, WebSocketDisconnect):
             raise WebSocketDisconnect
 
     async def send_loop():
-        async with broadcaster.subscribe("chat") as subscriber:
-            async for event in subscriber:
+        window = base.WS_BATCH_WINDOW_MS / 1000
+        # Events addressed to this user arrive on the same socket
+        channels = [channel]
+        if session.user_uuid is not None:
+            channels.append(user_channel(session.user_uuid))
+        async with broadcaster.subscribe_many(channels, last_event_id) as subscriber:
+            while True:
                 try:
-                    await ws.send_text(event.message)
-                except WebSocketDisconnect:
+                    events = await subscriber.get_batch(
+                        base.WS_BATCH_MAX_EVENTS,
+                        base.WS_BATCH_MAX_BYTES,
+                        window,
+                    )
+                    await protocol.send_events(ws, events)
+                except (Unsubscribed, WebSocketDisconnect):
                     break
+        # The subscription also ends when the broadcaster evicts
+        # this socket for falling behind
+        raise WebSocketDisconnect
 
-    try:
-        # Run both loops concurrently
-        await asyncio.gather(receive_loop(), send_loop())
-    except WebSocketDisconnect:
-        await ws.close(1001)
\ No newline at end of file
+    with sockets.track(ws), presence.track(session.user_uuid):
+        await serve_until_closed(
+            ws, receive_loop(), send_loop(), sockets.heartbeat(ws)
+        )
\ No newline at end of file
@@ -0,0 +1,18 @@
+from uuid import UUID
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class ChatMessageItem(BaseModel):
+    uuid: UUID
+    room: str
+    user_uuid: UUID | None
+    message: str
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
+class ChatHistoryPage(BaseModel):
+    items: list[ChatMessageItem]
+    next_cursor: str | None
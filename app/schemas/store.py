@@ -1,5 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
+from app.config import base
 from decimal import Decimal
+from uuid import UUID
+import json
 
 class CreateProduct(BaseModel):
     title: str
@@ -8,3 +11,55 @@ class CreateProduct(BaseModel):
     discount: Decimal | None = None
     free_shipping: bool = False
     specs: list[str]
+
+
+class ProductImportRow(BaseModel):
+    """
+    One line of a bulk product import (CSV or NDJSON).
+
+    In CSV files ``specs`` may be a JSON list or ``|``-separated values
+    and ``images`` are ``|``-separated URLs or paths inside the archive.
+    The first image becomes the primary one.
+    """
+    title: str = Field(min_length=1, max_length=255)
+    price: Decimal = Field(ge=0, max_digits=10, decimal_places=2)
+    description: str = Field(max_length=800)
+    discount: Decimal | None = Field(
+        None, ge=0, max_digits=10, decimal_places=2
+    )
+    free_shipping: bool = False
+    specs: list[str] = []
+    images: list[str] = []
+
+    @field_validator("discount", mode="before")
+    def empty_discount(cls, v):
+        return None if v == "" else v
+
+    @field_validator("free_shipping", mode="before")
+    def empty_free_shipping(cls, v):
+        return False if v == "" else v
+
+    @field_validator("specs", mode="before")
+    def split_specs(cls, v):
+        if isinstance(v, str):
+            v = v.strip()
+            if v.startswith("["):
+                return json.loads(v)
+            return [s.strip() for s in v.split("|") if s.strip()]
+        return v
+
+    @field_validator("images", mode="before")
+    def split_images(cls, v):
+        if isinstance(v, str):
+            return [s.strip() for s in v.split("|") if s.strip()]
+        return v
+
+
+class ProductUUIDList(BaseModel):
+    uuids: list[UUID] = Field(
+        min_length=1, max_length=base.PRODUCT_BATCH_MAX_SIZE
+    )
+
+
+class CartItemQty(BaseModel):
+    qty: int = Field(ge=0, le=base.CART_MAX_QTY)
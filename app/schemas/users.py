@@ -1,4 +1,6 @@
 import re
+from uuid import UUID
+from app.config import base
 from pydantic import (
     BaseModel,
     EmailStr,
@@ -90,3 +92,39 @@ class JWTResponse(BaseModel):
 
 class JWTRefresh(BaseModel):
     refresh_token: str
+
+
+class UserAdminItem(BaseModel):
+    id: int
+    uuid: UUID
+    full_name: str
+    email: str
+    phone: str | None
+    role: str
+    is_active: bool
+    store_name: str | None
+
+    @field_validator("role", mode="before")
+    def role_value(cls, v):
+        return getattr(v, "value", v)
+
+    model_config = {"from_attributes": True}
+
+
+class UserPage(BaseModel):
+    items: list[UserAdminItem]
+    next_after: int | None
+    total: int
+
+
+class PresenceQuery(BaseModel):
+    uuids: list[UUID] = Field(
+        min_length=1, max_length=base.PRESENCE_QUERY_MAX
+    )
+
+
+class NodePresence(BaseModel):
+    node: str
+    connections: int
+    users: int
+    updated_at: float
@@ -0,0 +1,307 @@
+"""
+Shopping carts kept in Redis, written back to Postgres.
+
+Each user's live cart is the hash ``cart:{user_id}`` (product uuid ->
+qty, plus the ``LOADED`` marker so an empty cart is told apart from a
+cache miss). Updates only touch Redis and add the user to the
+``cart:dirty`` set; a background task pops that set in batches and
+rewrites the ``Cart``/``CartItem`` rows of those users in one
+transaction. A cart missing from Redis (never loaded, or evicted after
+``CART_TTL_SECONDS``) is rehydrated from Postgres on the next access.
+
+The dirty set lives in Redis, so carts changed right before a crash are
+still written by the next node that flushes.
+"""
+import uuid
+import asyncio
+import logging
+from redis import asyncio as redis
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import base
+from app.core.db.redis import redis_client
+from app.core.db.sessionmanager import sessionmanager
+from app.core.metrics import registry
+from app.managers.store import CartItems, Carts
+from app.models.store import Cart, CartItem, Product
+from app.models.users import User
+
+logger = logging.getLogger(__name__)
+
+DIRTY_KEY = "cart:dirty"
+LOADED = "_"
+
+# Results of _SET_QTY besides the new quantity
+NOT_LOADED = -1
+TOO_MANY_ITEMS = -2
+
+# Only touch carts that are loaded: writing into an evicted key would
+# leave a partial cart that the next flush copies over the stored one
+_SET_QTY = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return -1 end
+local qty = tonumber(ARGV[2])
+if ARGV[3] == 'add' then
+    qty = qty + tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+end
+qty = math.min(qty, tonumber(ARGV[4]))
+if qty <= 0 then
+    qty = 0
+    redis.call('HDEL', KEYS[1], ARGV[1])
+else
+    if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 0
+        and redis.call('HLEN', KEYS[1]) > tonumber(ARGV[5]) then
+        return -2
+    end
+    redis.call('HSET', KEYS[1], ARGV[1], qty)
+end
+redis.call('EXPIRE', KEYS[1], ARGV[6])
+redis.call('SADD', KEYS[2], ARGV[7])
+return qty
+"""
+
+# Load a cart read from Postgres unless another request got there first
+_HYDRATE = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return redis.call('HGETALL', KEYS[1])
+"""
+
+cart_flushed = registry.counter(
+    "cart_flushed_total",
+    "Carts written back from Redis to Postgres.",
+)
+cart_flush_failed = registry.counter(
+    "cart_flush_failed_total",
+    "Carts put back on the dirty set after a failed write.",
+)
+cart_hydrated = registry.counter(
+    "cart_hydrated_total",
+    "Carts loaded from Postgres on a Redis miss.",
+)
+
+
+class CartFull(ValueError):
+    pass
+
+
+def cart_key(user_id: int) -> str:
+    return f"cart:{user_id}"
+
+
+def _items(raw: dict[bytes, bytes]) -> dict[uuid.UUID, int]:
+    return {
+        uuid.UUID(field.decode()): int(qty)
+        for field, qty in raw.items()
+        if field != LOADED.encode()
+    }
+
+
+class CartStore:
+    def __init__(
+        self,
+        conn: redis.Redis,
+        ttl: int = base.CART_TTL_SECONDS,
+        flush_interval: float = base.CART_FLUSH_SECONDS,
+        batch_size: int = base.CART_FLUSH_BATCH,
+        max_items: int = base.CART_MAX_ITEMS,
+        max_qty: int = base.CART_MAX_QTY,
+    ) -> None:
+        self._conn = conn
+        self._ttl = ttl
+        self._flush_interval = flush_interval
+        self._batch_size = batch_size
+        self._max_items = max_items
+        self._max_qty = max_qty
+        self._set_qty = conn.register_script(_SET_QTY)
+        self._hydrate = conn.register_script(_HYDRATE)
+        self._task: asyncio.Task[None] | None = None
+
+    async def get(self, db: AsyncSession, user_id: int) -> dict[uuid.UUID, int]:
+        """Product uuid -> qty, loading the cart from Postgres on a miss."""
+        pipe = self._conn.pipeline(transaction=False)
+        pipe.hgetall(cart_key(user_id))
+        pipe.expire(cart_key(user_id), self._ttl)
+        raw, _ = await pipe.execute()
+        if not raw:
+            raw = await self._load(db, user_id)
+        return _items(raw)
+
+    async def set(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        product_uuid: uuid.UUID,
+        qty: int,
+        add: bool = False,
+    ) -> int:
+        """
+        Set (or with ``add``, increase) the qty of one product, capped at
+        ``CART_MAX_QTY``. A result of 0 removes the item. Returns the new
+        qty; raises ``CartFull`` past ``CART_MAX_ITEMS`` products.
+        """
+        for _ in range(2):
+            result = await self._set_qty(
+                keys=[cart_key(user_id), DIRTY_KEY],
+                args=[
+                    str(product_uuid), qty, "add" if add else "set",
+                    self._max_qty, self._max_items, self._ttl, user_id,
+                ],
+            )
+            if result != NOT_LOADED:
+                break
+            await self._load(db, user_id)
+        if result == TOO_MANY_ITEMS:
+            raise CartFull(f"A cart holds at most {self._max_items} products")
+        return result
+
+    async def discard(self, user_id: int, product_uuids: list[uuid.UUID]) -> None:
+        if not product_uuids:
+            return
+        pipe = self._conn.pipeline(transaction=True)
+        pipe.hdel(cart_key(user_id), *[str(u) for u in product_uuids])
+        pipe.sadd(DIRTY_KEY, user_id)
+        await pipe.execute()
+
+    async def clear(self, user_id: int) -> None:
+        pipe = self._conn.pipeline(transaction=True)
+        pipe.delete(cart_key(user_id))
+        pipe.hset(cart_key(user_id), LOADED, 1)
+        pipe.expire(cart_key(user_id), self._ttl)
+        pipe.sadd(DIRTY_KEY, user_id)
+        await pipe.execute()
+
+    async def _load(self, db: AsyncSession, user_id: int) -> dict[bytes, bytes]:
+        rows = await db.execute(
+            select(Product.uuid, CartItem.qty)
+            .join(Cart, Cart.id == CartItem.cart_id)
+            .join(Product, Product.id == CartItem.product_id)
+            .where(
+                Cart.user_id == user_id,
+                Cart.deleted_at.is_(None),
+                CartItem.deleted_at.is_(None),
+                Product.deleted_at.is_(None),
+            )
+        )
+        mapping = [LOADED, 1]
+        for product_uuid, qty in rows:
+            mapping += [str(product_uuid), qty]
+        cart_hydrated.inc()
+        raw = await self._hydrate(
+            keys=[cart_key(user_id)], args=[self._ttl, *mapping]
+        )
+        return dict(zip(raw[::2], raw[1::2]))
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush task and write out every dirty cart."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except redis.RedisError as e:
+            # Still on the dirty set; the next node to flush writes them
+            logger.warning("final cart flush skipped: %s", e)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            try:
+                await self.flush()
+            except redis.RedisError as e:
+                logger.warning("cart flush skipped: %s", e)
+
+    async def flush(self) -> None:
+        while True:
+            popped = await self._conn.spop(DIRTY_KEY, self._batch_size)
+            if not popped:
+                return
+            user_ids = [int(u) for u in popped]
+            await self._write_or_requeue(user_ids)
+            if len(popped) < self._batch_size:
+                return
+
+    async def _write_or_requeue(self, user_ids: list[int]) -> None:
+        try:
+            await self._write(user_ids)
+        except asyncio.CancelledError:
+            await self._conn.sadd(DIRTY_KEY, *user_ids)
+            raise
+        except (SQLAlchemyError, redis.RedisError, OSError) as e:
+            # Left for the next tick; any change made meanwhile is
+            # picked up then as well
+            logger.warning("cart write failed for %d users: %s",
+                           len(user_ids), e)
+            cart_flush_failed.inc(len(user_ids))
+            await self._conn.sadd(DIRTY_KEY, *user_ids)
+
+    async def _write(self, user_ids: list[int]) -> None:
+        # Sorted so concurrent flushes take the row locks in one order
+        user_ids = sorted(set(user_ids))
+        async with sessionmanager.session() as db:
+            try:
+                await Carts.upsert(
+                    db, [{"user_id": u} for u in user_ids], ["user_id"],
+                    update_columns=[],
+                )
+            except IntegrityError:
+                # Users deleted since; their carts go with them
+                await db.rollback()
+                user_ids = sorted(await db.scalars(
+                    select(User.id).where(User.id.in_(user_ids))
+                ))
+                await Carts.upsert(
+                    db, [{"user_id": u} for u in user_ids], ["user_id"],
+                    update_columns=[],
+                )
+            # Another node may flush the same users at the same time
+            # (popped again after a new change). The lock serializes the
+            # two, and reading Redis only once it is held means the
+            # later writer always has the newer cart.
+            cart_ids = dict((await db.execute(
+                select(Cart.user_id, Cart.id)
+                .where(Cart.user_id.in_(user_ids))
+                .order_by(Cart.id)
+                .with_for_update()
+            )).all())
+
+            pipe = self._conn.pipeline(transaction=False)
+            for user_id in cart_ids:
+                pipe.hgetall(cart_key(user_id))
+            carts = {
+                user_id: _items(raw)
+                for user_id, raw in zip(cart_ids, await pipe.execute())
+                # Evicted before it was flushed; Postgres keeps the last write
+                if LOADED.encode() in raw
+            }
+            if not carts:
+                return
+
+            uuids = {p for items in carts.values() for p in items}
+            product_ids = dict((await db.execute(
+                select(Product.uuid, Product.id).where(
+                    Product.uuid.in_(uuids), Product.deleted_at.is_(None)
+                )
+            )).all()) if uuids else {}
+
+            # Snapshot semantics: the Redis hash is the whole cart
+            await db.execute(delete(CartItem).where(
+                CartItem.cart_id.in_([cart_ids[u] for u in carts])
+            ))
+            await CartItems.bulk_create(db, [
+                {"cart_id": cart_ids[user_id], "product_id": product_ids[p], "qty": qty}
+                for user_id, items in carts.items()
+                for p, qty in items.items()
+                if p in product_ids
+            ])
+            await db.commit()
+        cart_flushed.inc(len(carts))
+
+
+carts = CartStore(redis_client)
@@ -0,0 +1,215 @@
+"""
+Write-behind storage for chat messages.
+
+``receive_loop`` only appends to an in-memory buffer; a background task
+writes it out in multi-row inserts once ``CHAT_HISTORY_BATCH_SIZE``
+messages are pending or every ``CHAT_HISTORY_FLUSH_MS``. Batches that
+fail to insert because the database is unreachable are parked on a
+Redis list and retried from there, so an outage does not lose them with
+the process. Inserts are ``ON CONFLICT (uuid) DO NOTHING``, which makes
+retries safe.
+
+A batch Postgres rejects for its data (e.g. a NUL byte in a message) is
+split in halves until the offending rows are alone; the rest is written
+and those rows go to the ``chat:history:dead`` list for inspection
+instead of blocking their batch forever.
+"""
+import json
+import uuid
+import asyncio
+import logging
+from datetime import datetime
+from redis import asyncio as redis
+from sqlalchemy import select
+from sqlalchemy.exc import (
+    DataError,
+    IntegrityError,
+    InterfaceError,
+    OperationalError,
+    SQLAlchemyError,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import base
+from app.core.db.redis import redis_client
+from app.core.db.sessionmanager import sessionmanager
+from app.core.metrics import Counter, registry
+from app.managers.chat import ChatMessages
+from app.models.users import User
+
+logger = logging.getLogger(__name__)
+
+RETRY_KEY = "chat:history:retry"
+DEAD_KEY = "chat:history:dead"
+
+# Errors worth retrying: the rows are fine, the database was not
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, OSError)
+
+chat_history_written = registry.counter(
+    "chat_history_written_total",
+    "Chat messages inserted into the history table.",
+)
+chat_history_parked = registry.counter(
+    "chat_history_parked_total",
+    "Chat messages moved to the Redis retry list after a failed insert.",
+)
+chat_history_dead = registry.counter(
+    "chat_history_dead_total",
+    "Chat messages Postgres rejected, moved to the dead-letter list.",
+)
+chat_history_dropped = registry.counter(
+    "chat_history_dropped_total",
+    "Chat messages lost: buffer full, or neither Postgres nor Redis took them.",
+)
+
+
+def _dump(row: dict) -> str:
+    return json.dumps({
+        **row,
+        "uuid": str(row["uuid"]),
+        "user_uuid": str(row["user_uuid"]) if row["user_uuid"] else None,
+        "created_at": row["created_at"].isoformat(),
+    })
+
+
+def _load(raw: bytes) -> dict:
+    row = json.loads(raw)
+    row["uuid"] = uuid.UUID(row["uuid"])
+    row["user_uuid"] = uuid.UUID(row["user_uuid"]) if row["user_uuid"] else None
+    row["created_at"] = datetime.fromisoformat(row["created_at"])
+    return row
+
+
+async def _without_unknown_senders(db: AsyncSession, batch: list[dict]) -> list[dict]:
+    senders = {row["user_uuid"] for row in batch if row["user_uuid"]}
+    known = set(
+        await db.scalars(select(User.uuid).where(User.uuid.in_(senders)))
+    ) if senders else set()
+    return [
+        row if row["user_uuid"] in known else {**row, "user_uuid": None}
+        for row in batch
+    ]
+
+
+class ChatHistoryBuffer:
+    def __init__(
+        self,
+        conn: redis.Redis,
+        batch_size: int = base.CHAT_HISTORY_BATCH_SIZE,
+        flush_interval: float = base.CHAT_HISTORY_FLUSH_MS / 1000,
+        max_pending: int = base.CHAT_HISTORY_MAX_PENDING,
+    ) -> None:
+        self._conn = conn
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._max_pending = max_pending
+        self._rows: list[dict] = []
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, row: dict) -> None:
+        """
+        Queue one message (``uuid``, ``room``, ``user_uuid``, ``message``,
+        ``created_at``) for the next flush. Never waits.
+        """
+        if len(self._rows) >= self._max_pending:
+            chat_history_dropped.inc()
+            return
+        self._rows.append(row)
+        if len(self._rows) >= self._batch_size:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush task and write out whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+            await self._retry_parked()
+
+    async def flush(self) -> None:
+        while self._rows:
+            batch = self._rows[:self._batch_size]
+            del self._rows[:self._batch_size]
+            await self._write_or_requeue(batch)
+
+    async def _write_or_requeue(self, batch: list[dict]) -> None:
+        try:
+            await self._write(batch)
+        except asyncio.CancelledError:
+            # Shutdown mid-insert: keep the rows for the final flush,
+            # rewriting any that made it is a no-op
+            self._rows[:0] = batch
+            raise
+
+    async def _write(self, batch: list[dict]) -> None:
+        try:
+            async with sessionmanager.session() as db:
+                try:
+                    await ChatMessages.upsert(db, batch, ["uuid"], update_columns=[])
+                except IntegrityError:
+                    # Senders come from token claims and may not exist
+                    # (any more); keep their messages without a sender
+                    await db.rollback()
+                    batch = await _without_unknown_senders(db, batch)
+                    await ChatMessages.upsert(db, batch, ["uuid"], update_columns=[])
+                await db.commit()
+        except TRANSIENT_ERRORS as e:
+            logger.warning("chat history insert failed, parking %d messages: %s",
+                           len(batch), e)
+            await self._park(RETRY_KEY, batch, chat_history_parked)
+            return
+        except (DataError, IntegrityError) as e:
+            if len(batch) > 1:
+                # Bisect down to the rows Postgres refuses
+                middle = len(batch) // 2
+                await self._write(batch[:middle])
+                await self._write(batch[middle:])
+                return
+            logger.error("chat history: message %s rejected: %s",
+                         batch[0]["uuid"], e)
+            await self._park(DEAD_KEY, batch, chat_history_dead)
+            return
+        except SQLAlchemyError as e:
+            # Neither the data nor the connection: retrying cannot help
+            logger.error("chat history insert failed for %d messages: %s",
+                         len(batch), e)
+            await self._park(DEAD_KEY, batch, chat_history_dead)
+            return
+        chat_history_written.inc(len(batch))
+
+    async def _park(self, key: str, batch: list[dict], counter: Counter) -> None:
+        try:
+            await self._conn.rpush(key, *[_dump(row) for row in batch])
+        except redis.RedisError as e:
+            chat_history_dropped.inc(len(batch))
+            logger.error("chat history: lost %d messages: %s", len(batch), e)
+            return
+        counter.inc(len(batch))
+
+    async def _retry_parked(self) -> None:
+        # One batch per tick, so a long outage is drained gradually
+        try:
+            raw = await self._conn.lpop(RETRY_KEY, self._batch_size)
+        except redis.RedisError:
+            return
+        if raw:
+            await self._write_or_requeue([_load(r) for r in raw])
+
+
+chat_history = ChatHistoryBuffer(redis_client)
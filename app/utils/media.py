@@ -1,6 +1,7 @@
 from fastapi import HTTPException, UploadFile
 from app.config.base import PROJECT_URL
 from pathlib import Path
+from typing import Iterable
 from io import BytesIO
 from PIL import Image
 import uuid
@@ -36,9 +37,18 @@ def save_file(content: bytes, base_dir: Path) -> str:
     return name
 
 
+def process_image_bytes(raw: bytes, filename: str, base_dir: Path) -> str:
+    verify_image(raw, filename)
+    webp = convert_to_webp(raw)
+    return save_file(webp, base_dir)
+
+
 def process_image(file: UploadFile, base_dir: Path) -> str:
     raw = file.file.read()
-    verify_image(raw, file.filename or "image")
-    webp = convert_to_webp(raw)
-    filename = save_file(webp, base_dir)
-    return filename
\ No newline at end of file
+    return process_image_bytes(raw, file.filename or "image", base_dir)
+
+
+def remove_files(paths: Iterable[str], base_dir: Path) -> None:
+    """Delete stored images by their ``/media/...`` path, if still there."""
+    for path in paths:
+        (base_dir / Path(path).name).unlink(missing_ok=True)
@@ -0,0 +1,375 @@
+"""
+Bulk product import.
+
+Rows are read incrementally from a CSV or NDJSON byte stream, validated
+one by one, and loaded per batch with ``COPY`` into a temporary staging
+table which is then merged into ``products`` with a single
+``INSERT ... SELECT ... ON CONFLICT (title) DO NOTHING``.
+Images are fetched and converted afterwards, in batches, by
+``process_import_images``.
+"""
+import csv
+import json
+import uuid
+import asyncio
+import logging
+import zipfile
+import codecs
+import socket
+import ipaddress
+import http.client
+import urllib.request
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterator
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import base
+from app.managers.store import ProductImages
+from app.schemas.store import ProductImportRow
+from app.utils import media as media_utils
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "ndjson")
+
+STAGING_TABLE = "product_import_staging"
+STAGING_COLUMNS = (
+    "row_no", "uuid", "user_id", "title", "price", "discount",
+    "free_shipping", "description", "specs",
+)
+CREATE_STAGING = f"""
+CREATE TEMP TABLE {STAGING_TABLE} (
+    row_no integer NOT NULL,
+    uuid uuid NOT NULL,
+    user_id integer NOT NULL,
+    title varchar(255) NOT NULL,
+    price numeric(10, 2) NOT NULL,
+    discount numeric(10, 2),
+    free_shipping boolean NOT NULL,
+    description varchar(800) NOT NULL,
+    specs varchar[] NOT NULL
+) ON COMMIT DROP
+"""
+MERGE_STAGING = f"""
+INSERT INTO products (
+    uuid, user_id, title, price, discount,
+    free_shipping, description, specs
+)
+SELECT uuid, user_id, title, price, discount,
+       free_shipping, description, specs
+FROM {STAGING_TABLE}
+ORDER BY row_no
+ON CONFLICT (title) DO NOTHING
+RETURNING id, uuid
+"""
+
+MAX_REPORTED_ERRORS = 1000
+
+
+@dataclass
+class PendingImages:
+    product_id: int
+    refs: list[str]
+
+
+@dataclass
+class ImportReport:
+    inserted: int = 0
+    failed: int = 0
+    errors: list[dict] = field(default_factory=list)
+    images: list[PendingImages] = field(default_factory=list)
+
+    def error(self, row_no: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_no, "error": message})
+
+    def as_dict(self) -> dict:
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "images_queued": sum(len(p.refs) for p in self.images),
+        }
+
+
+def detect_format(filename: str | None, declared: str | None = None) -> str:
+    if declared:
+        fmt = declared.lower()
+    elif filename and filename.lower().endswith((".ndjson", ".jsonl")):
+        fmt = "ndjson"
+    else:
+        fmt = "csv"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format {fmt!r}, use one of {FORMATS}")
+    return fmt
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_records(
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+) -> AsyncIterator[tuple[int, dict | None, str | None]]:
+    """
+    Yield ``(row_no, record, error)`` for every data row in the stream.
+    CSV records may span lines inside quoted fields; a record is complete
+    once its quotes are balanced.
+    """
+    row_no = 0
+    header: list[str] | None = None
+    buffered = ""
+
+    async for line in iter_lines(chunks):
+        if fmt == "ndjson":
+            if not line.strip():
+                continue
+            row_no += 1
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield row_no, None, f"invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield row_no, None, "expected a JSON object"
+                continue
+            yield row_no, record, None
+            continue
+
+        buffered = f"{buffered}\n{line}" if buffered else line
+        if buffered.count('"') % 2:
+            continue
+        raw, buffered = buffered, ""
+        if not raw.strip():
+            continue
+        values = next(csv.reader([raw]))
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        row_no += 1
+        if len(values) != len(header):
+            yield row_no, None, (
+                f"expected {len(header)} columns, got {len(values)}"
+            )
+            continue
+        yield row_no, dict(zip(header, values)), None
+
+    if buffered:
+        yield row_no + 1, None, "unterminated quoted field"
+
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}"
+        for err in e.errors()
+    )
+
+
+async def _load_batch(
+    db: AsyncSession,
+    user_id: int,
+    batch: list[tuple[int, ProductImportRow]],
+    report: ImportReport,
+) -> None:
+    keys = {}
+    records = []
+    for row_no, row in batch:
+        key = uuid.uuid4()
+        keys[key] = (row_no, row)
+        records.append((
+            row_no, key, user_id, row.title, row.price, row.discount,
+            row.free_shipping, row.description, row.specs,
+        ))
+
+    await db.execute(text(CREATE_STAGING))
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        STAGING_TABLE, records=records, columns=STAGING_COLUMNS
+    )
+    result = await db.execute(text(MERGE_STAGING))
+    inserted = {key: product_id for product_id, key in result.all()}
+    await db.commit()
+
+    for key, (row_no, row) in keys.items():
+        product_id = inserted.get(key)
+        if product_id is None:
+            report.error(row_no, f"title already exists: {row.title!r}")
+            continue
+        report.inserted += 1
+        if row.images:
+            report.images.append(PendingImages(product_id, row.images))
+
+
+async def import_products(
+    db: AsyncSession,
+    user_id: int,
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    batch_size: int = base.PRODUCT_IMPORT_BATCH_SIZE,
+) -> ImportReport:
+    """
+    Stream, validate and load products for ``user_id``. Each batch is
+    committed on its own, so a bad row never aborts the rest of the file.
+    """
+    report = ImportReport()
+    batch: list[tuple[int, ProductImportRow]] = []
+
+    async for row_no, record, error in iter_records(chunks, fmt):
+        if error is not None:
+            report.error(row_no, error)
+            continue
+        try:
+            batch.append((row_no, ProductImportRow.model_validate(record)))
+        except ValidationError as e:
+            report.error(row_no, _validation_message(e))
+            continue
+        if len(batch) >= batch_size:
+            await _load_batch(db, user_id, batch, report)
+            batch = []
+
+    if batch:
+        await _load_batch(db, user_id, batch, report)
+    return report
+
+
+def _public_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT,
+                       source_address=None, **kwargs) -> socket.socket:
+    """
+    ``socket.create_connection`` that refuses private, loopback,
+    link-local and other non-global targets. The check runs on the
+    resolved address and the socket connects to that same address, so
+    DNS cannot change the answer in between.
+    """
+    host, port = address
+    infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    for *_, sockaddr in infos:
+        if not ipaddress.ip_address(sockaddr[0]).is_global:
+            raise ValueError(f"image host {host!r} is not a public address")
+    return socket.create_connection(
+        (infos[0][4][0], port), timeout, source_address
+    )
+
+
+class _PublicHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._create_connection = _public_connection
+
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._create_connection = _public_connection
+
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_PublicHTTPConnection, req)
+
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PublicHTTPSConnection, req)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        raise ValueError(f"image URL redirects ({code}), not followed")
+
+
+# No proxies (they would connect for us) and no redirects
+_image_opener = urllib.request.build_opener(
+    urllib.request.ProxyHandler({}),
+    _NoRedirect,
+    _PublicHTTPHandler,
+    _PublicHTTPSHandler,
+)
+
+
+def _read_image(ref: str, archive: zipfile.ZipFile | None) -> bytes:
+    if ref.startswith(("http://", "https://")):
+        with _image_opener.open(
+            ref, timeout=base.PRODUCT_IMPORT_FETCH_TIMEOUT
+        ) as res:
+            data = res.read(base.PRODUCT_IMPORT_MAX_IMAGE_BYTES + 1)
+    elif archive is not None:
+        data = archive.read(ref.lstrip("/"))
+    else:
+        raise ValueError("no archive given for a relative image path")
+    if len(data) > base.PRODUCT_IMPORT_MAX_IMAGE_BYTES:
+        raise ValueError("image too large")
+    return data
+
+
+def _process_batch(
+    batch: list[PendingImages],
+    archive_path: Path | None,
+) -> Iterator[tuple[dict | None, dict | None]]:
+    archive = zipfile.ZipFile(archive_path) if archive_path else None
+    try:
+        for pending in batch:
+            has_primary = False
+            for ref in pending.refs:
+                try:
+                    raw = _read_image(ref, archive)
+                    filename = media_utils.process_image_bytes(
+                        raw, ref, base.MEDIA_PRODUCTS
+                    )
+                except Exception as e:
+                    detail = getattr(e, "detail", None) or str(e)
+                    yield None, {
+                        "product_id": pending.product_id,
+                        "image": ref,
+                        "error": detail,
+                    }
+                    continue
+                yield {
+                    "product_id": pending.product_id,
+                    "path": f"/media/products/{filename}",
+                    "is_primary": not has_primary,
+                }, None
+                has_primary = True
+    finally:
+        if archive is not None:
+            archive.close()
+
+
+async def process_import_images(
+    db: AsyncSession,
+    pending: list[PendingImages],
+    archive_path: Path | None = None,
+    batch_size: int = base.PRODUCT_IMPORT_IMAGE_BATCH_SIZE,
+) -> list[dict]:
+    """
+    Fetch/convert images off the event loop and insert their rows one
+    batch of products at a time. Returns the images that failed.
+    """
+    failed: list[dict] = []
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        results = await asyncio.to_thread(
+            lambda: list(_process_batch(batch, archive_path))
+        )
+        rows = [row for row, _ in results if row is not None]
+        failed.extend(err for _, err in results if err is not None)
+        await ProductImages.bulk_create(db, rows)
+        await db.commit()
+    if failed:
+        logger.warning("product import: %d images failed", len(failed),
+                       extra={"failed_images": failed[:20]})
+    return failed
@@ -0,0 +1,98 @@
+"""
+Token buckets.
+
+``TokenBucket`` refills continuously at ``rate`` tokens per second up
+to ``burst``, in process memory: right for limits of one connection.
+``RedisTokenBucket`` keeps one such bucket per key (e.g. a user uuid)
+in Redis and updates it atomically, so the limit holds across every
+worker and node the key has connections on.
+"""
+import time
+import logging
+from redis import asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "_tokens", "_updated")
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+
+    def available(self, n: float = 1) -> bool:
+        """Whether ``n`` tokens could be taken now. A rate of 0 never limits."""
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+        return self._tokens >= n
+
+    def take(self, n: float = 1) -> bool:
+        """Take ``n`` tokens if available."""
+        if not self.available(n):
+            return False
+        if self.rate > 0:
+            self._tokens -= n
+        return True
+
+
+# Refill and take in one step, on Redis' clock so nodes agree on time.
+# The key expires once it would be full again anyway.
+_TAKE = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local n = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local taken = 0
+if tokens >= n then
+    tokens = tokens - n
+    taken = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return taken
+"""
+
+
+class RedisTokenBucket:
+    def __init__(
+        self,
+        conn: redis.Redis,
+        rate: float,
+        burst: float,
+        prefix: str = "ratelimit",
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._prefix = prefix
+        self._take = conn.register_script(_TAKE)
+
+    async def take(self, key: str, n: float = 1) -> bool:
+        """
+        Take ``n`` tokens from ``key``'s bucket if available. A rate of 0
+        never limits, and neither does an unreachable Redis: chat keeps
+        working, limited per connection only.
+        """
+        if self.rate <= 0:
+            return True
+        try:
+            taken = await self._take(
+                keys=[f"{self._prefix}:{key}"],
+                args=[self.rate, self.burst, n],
+            )
+        except redis.RedisError as e:
+            logger.warning("rate limit check skipped: %s", e)
+            return True
+        return bool(taken)
@@ -1,6 +1,49 @@
-from app.models.store import Product
+from collections import defaultdict
+from typing import Optional, Sequence
+from sqlalchemy import select, func
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.store import Product, ProductImage, Review
 from app.utils.media import full_url
-from typing import Optional
+
+
+def review_stats_columns():
+    """
+    Correlated ``(count, avg)`` subqueries over the reviews of each
+    selected product; cheap for small result sets thanks to the
+    ``reviews.product_id`` index.
+    """
+    review_count = (
+        select(func.count(Review.id))
+        .where(Review.product_id == Product.id)
+        .scalar_subquery()
+    )
+    review_avg = (
+        select(func.avg(Review.rating))
+        .where(Review.product_id == Product.id)
+        .scalar_subquery()
+    )
+    return review_count, review_avg
+
+
+async def load_images(db: AsyncSession, products: Sequence[Product]) -> None:
+    """
+    Populate ``Product.images`` for many products with a single query,
+    without going through the (async-unsafe) lazy loader.
+    """
+    by_product: dict[int, list[ProductImage]] = defaultdict(list)
+    ids = [p.id for p in products]
+    if ids:
+        result = await db.scalars(
+            select(ProductImage)
+            .where(ProductImage.product_id.in_(ids))
+            .order_by(ProductImage.id)
+        )
+        for img in result:
+            by_product[img.product_id].append(img)
+    for product in products:
+        set_committed_value(product, "images", by_product[product.id])
+
 
 def serialize_product(product: Product, review_count: int = 0, review_avg: Optional[float] = None) -> dict:
     primary = None
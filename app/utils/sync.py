@@ -0,0 +1,106 @@
+import json
+import base64
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, select
+from sqlalchemy.exc import SQLAlchemyError
+from app.config import base
+from app.core.db.sessionmanager import sessionmanager
+from app.core.metrics import registry
+from app.models.store import ProductTombstone
+
+logger = logging.getLogger(__name__)
+
+tombstones_pruned = registry.counter(
+    "product_tombstones_pruned_total",
+    "Product tombstones deleted after PRODUCT_TOMBSTONE_RETENTION_DAYS.",
+)
+
+
+def encode_cursor(ts: datetime, item_id: int) -> str:
+    """Opaque keyset cursor for a ``(timestamp, id)`` position."""
+    raw = json.dumps([ts.isoformat(), item_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, item_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(ts), int(item_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def tombstone_horizon(retention_days: float | None = None) -> datetime:
+    """
+    Oldest position a changes-feed cursor can resume from: tombstones
+    before it may already be pruned, so an older cursor could miss
+    deletes and has to start over with a full sync.
+    """
+    if retention_days is None:
+        retention_days = base.PRODUCT_TOMBSTONE_RETENTION_DAYS
+    return datetime.now(timezone.utc) - timedelta(days=retention_days)
+
+
+class TombstonePruner:
+    """
+    Deletes product tombstones older than the retention window every
+    ``interval`` seconds, ``batch_size`` rows per transaction. Every
+    worker runs one; ``SKIP LOCKED`` keeps them off each other's rows.
+    """
+
+    def __init__(
+        self,
+        interval: float = base.PRODUCT_TOMBSTONE_PRUNE_SECONDS,
+        batch_size: int = base.PRODUCT_TOMBSTONE_PRUNE_BATCH,
+    ) -> None:
+        self._interval = interval
+        self._batch_size = batch_size
+        self._task: asyncio.Task[None] | None = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.prune()
+            except (SQLAlchemyError, OSError) as e:
+                logger.warning("tombstone prune skipped: %s", e)
+
+    async def prune(self) -> int:
+        cutoff = tombstone_horizon()
+        expired = (
+            select(ProductTombstone.id)
+            .where(ProductTombstone.created_at < cutoff)
+            .order_by(ProductTombstone.created_at)
+            .limit(self._batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            delete(ProductTombstone)
+            .where(ProductTombstone.id.in_(expired))
+            .execution_options(synchronize_session=False)
+        )
+        total = 0
+        while True:
+            async with sessionmanager.session() as db:
+                deleted = (await db.execute(stmt)).rowcount
+                await db.commit()
+            total += deleted
+            tombstones_pruned.inc(deleted)
+            if deleted < self._batch_size:
+                return total
+
+
+tombstone_pruner = TombstonePruner()
@@ -3,14 +3,12 @@ set -e
 
 mkdir -p ./media
 
-# Use uvloop + httptools
-export UVICORN_LOOP=uvloop
-export UVICORN_HTTP=httptools
-
-uv run uvicorn main:app \
-    --workers 4 \
-    --host 0.0.0.0 \
-    --port 8000 \
-    --http httptools \
-    --loop uvloop
-
+# main.py rather than the uvicorn CLI: its server sends websockets a
+# reconnect hint before uvicorn closes them on shutdown. uvloop and
+# httptools are picked up automatically when installed; websocket
+# ping/deflate settings come from WS_PING_* / WS_PER_MESSAGE_DEFLATE.
+export SERVER_HOST="${SERVER_HOST:-0.0.0.0}"
+export SERVER_PORT="${SERVER_PORT:-8000}"
+export SERVER_WORKERS="${SERVER_WORKERS:-4}"
+
+exec uv run python main.py
@@ -1,10 +1,18 @@
+import os
+import tempfile
+from pathlib import Path
 import uvicorn
+from uvicorn.supervisors import Multiprocess
 from fastapi import FastAPI
 from app.config import base
+from app.core.logs import configure_logging
 from app.lifespan import lifespan
+from app.core.ws import sockets as ws_sockets
 from app.routes import load_routes
+from app.middlewares.metrics import MetricsMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 
+configure_logging(base.LOG_LEVEL)
 
 app = FastAPI(
         title=base.APP_NAME,
@@ -24,8 +32,52 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 load_routes(app=app)
 
+
+class Server(uvicorn.Server):
+    async def shutdown(self, sockets=None) -> None:
+        # Close websockets with a reconnect hint before uvicorn closes
+        # them without one
+        await ws_sockets.drain()
+        await super().shutdown(sockets=sockets)
+
+
+def serve() -> None:
+    """
+    Run ``Server`` (rather than the uvicorn CLI, which would use the
+    stock one) with ``SERVER_WORKERS`` processes, the way uvicorn.run
+    does.
+
+    Workers aggregate /metrics through ``METRICS_DIR``; snapshots left
+    by a previous run are cleared first, so counters start from zero
+    like the processes do.
+    """
+    if base.SERVER_WORKERS > 1 and not base.METRICS_DIR:
+        # Read by the workers, which import the settings anew
+        os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="metrics-")
+    elif base.METRICS_DIR:
+        for path in Path(base.METRICS_DIR).glob("*.json"):
+            path.unlink(missing_ok=True)
+    config = uvicorn.Config(
+        app="main:app",
+        host=base.SERVER_HOST,
+        port=base.SERVER_PORT,
+        workers=base.SERVER_WORKERS,
+        log_level=base.LOG_LEVEL.lower(),
+        ws_ping_interval=base.WS_PING_INTERVAL,
+        ws_ping_timeout=base.WS_PING_TIMEOUT,
+        ws_per_message_deflate=base.WS_PER_MESSAGE_DEFLATE,
+    )
+    server = Server(config)
+    if config.workers > 1:
+        sock = config.bind_socket()
+        Multiprocess(config, target=server.run, sockets=[sock]).run()
+    else:
+        server.run()
+
+
 if __name__ == "__main__":
-    uvicorn.run(app="main:app", workers=1, log_level="debug")
+    serve()
@@ -0,0 +1,66 @@
+"""
+Publish-to-delivery latency of the Broadcast backends.
+
+Each message carries its send time; one local subscriber records when
+it comes out of its queue. ``memory://`` always runs, Redis backends
+only when a URL is given.
+
+    python -m scripts.bench_broadcast --messages 5000 \
+        --redis redis://localhost:6379/1
+"""
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from app.core.ws import Broadcast
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(url: str, n: int, payload_size: int) -> None:
+    channel = "bench:broadcast"
+    padding = "x" * payload_size
+    latencies: list[float] = []
+
+    async with Broadcast(url, queue_size=n) as broadcast:
+        async with broadcast.subscribe(channel) as subscriber:
+
+            async def consume() -> None:
+                while len(latencies) < n:
+                    event = await subscriber.get()
+                    sent = json.loads(event.message)["t"]
+                    latencies.append(time.perf_counter() - sent)
+
+            consumer = asyncio.create_task(consume())
+            start = time.perf_counter()
+            for _ in range(n):
+                message = json.dumps({"t": time.perf_counter(), "p": padding})
+                await broadcast.publish(channel, message)
+                # memory:// publish never suspends; let delivery interleave
+                await asyncio.sleep(0)
+            await consumer
+            elapsed = time.perf_counter() - start
+
+    ms = [v * 1000 for v in latencies]
+    print(f"{url.split('://')[0]:<14} {n:>7} msgs  {n / elapsed:>9.0f} msg/s  "
+          f"mean {statistics.mean(ms):>7.3f} ms  p50 {percentile(ms, .5):>7.3f}  "
+          f"p95 {percentile(ms, .95):>7.3f}  p99 {percentile(ms, .99):>7.3f}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    for url in ["memory://", *args.redis]:
+        await run(url, args.messages, args.payload)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--payload", type=int, default=100,
+                        help="padding bytes per message")
+    parser.add_argument("--redis", action="append", default=[],
+                        help="redis:// or redis+streams:// URL, repeatable")
+    asyncio.run(main(parser.parse_args()))
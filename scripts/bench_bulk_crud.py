@@ -0,0 +1,65 @@
+"""
+Compare the per-row ``BaseCRUD.create`` path with ``bulk_create``,
+``upsert`` and ``bulk_soft_delete`` against the configured database.
+
+Everything runs inside a transaction that is rolled back at the end.
+
+    python -m scripts.bench_bulk_crud --rows 2000
+"""
+import time
+import uuid
+import asyncio
+import argparse
+from app.models.users import User
+from app.managers.users import Users
+from app.core.db.sessionmanager import sessionmanager
+
+
+def user_rows(n: int, tag: str) -> list[dict]:
+    return [
+        {
+            "full_name": f"bench {tag} {i}",
+            "email": f"bench-{tag}-{i}@example.com",
+            "password": "x",
+            "phone": "900000000",
+        }
+        for i in range(n)
+    ]
+
+
+async def timed(label: str, n: int, coro) -> None:
+    start = time.perf_counter()
+    await coro
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {n:>7} rows  {elapsed * 1000:>9.1f} ms  "
+          f"{n / elapsed:>10.0f} rows/s")
+
+
+async def per_row(db, rows: list[dict]) -> None:
+    for row in rows:
+        await Users.create(db=db, obj=User(**row))
+
+
+async def main(n: int) -> None:
+    tag = uuid.uuid4().hex[:8]
+    async with sessionmanager.session() as db:
+        await timed("create (per row)", n, per_row(db, user_rows(n, f"{tag}-a")))
+        await timed("bulk_create", n, Users.bulk_create(db, user_rows(n, f"{tag}-b")))
+
+        rows = user_rows(n, f"{tag}-b")
+        for row in rows:
+            row["phone"] = "911111111"
+        await timed("upsert (all conflict)", n, Users.upsert(db, rows, ["email"]))
+
+        created = await Users.bulk_create(db, user_rows(n, f"{tag}-c"))
+        ids = [u.id for u in created]
+        await timed("bulk_soft_delete", n, Users.bulk_soft_delete(db, ids))
+        await db.rollback()
+    await sessionmanager.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows))
@@ -0,0 +1,87 @@
+"""
+Bytes on the wire and encode CPU per chat message, JSON text frames
+versus the chat.msgpack subprotocol.
+
+Payloads are built the way receive_loop builds them. "deflate" is the
+size permessage-deflate would send (raw deflate, no context takeover).
+For msgpack, "pack" is the cost for the first socket an event goes to
+and "frame" the cost for every further socket (the packed body is
+cached on the event).
+
+    python -m scripts.bench_ws_protocol --sizes 32 256 2048 --batch 1 16
+"""
+import json
+import time
+import uuid
+import zlib
+import argparse
+from datetime import datetime, timezone
+from app.core.ws import Event, MsgpackProtocol, encode_frame, msgpack
+
+
+def chat_event(size: int) -> Event:
+    payload = json.dumps({
+        "type": "message",
+        "uuid": str(uuid.uuid4()),
+        "room": "lobby",
+        "user": str(uuid.uuid4()),
+        "message": "lorem ipsum " * (size // 12) + "x" * (size % 12),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    })
+    return Event("chat:lobby", payload)
+
+
+def deflated_size(frame: bytes) -> int:
+    compressor = zlib.compressobj(wbits=-15)
+    return len(compressor.compress(frame) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4
+
+
+def per_call_us(fn, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def run(size: int, batch: int, rounds: int, threshold: int) -> None:
+    events = [chat_event(size) for _ in range(batch)]
+    protocol = MsgpackProtocol(compress_threshold=threshold)
+
+    json_frame = encode_frame(events).encode()
+    json_us = per_call_us(lambda: encode_frame(events).encode(), rounds)
+
+    def pack_fresh() -> bytes:
+        for e in events:
+            e.packed = None
+        return protocol.frame(events)
+
+    pack_us = per_call_us(pack_fresh, rounds)
+    mp_frame = protocol.frame(events)
+    frame_us = per_call_us(lambda: protocol.frame(events), rounds)
+
+    label = f"{size:>5} B x{batch:<3}"
+    print(f"{label} json     {len(json_frame):>7} B  deflate {deflated_size(json_frame):>7} B  "
+          f"encode {json_us / batch:>7.2f} us/msg")
+    print(f"{label} msgpack  {len(mp_frame):>7} B  deflate {deflated_size(mp_frame):>7} B  "
+          f"pack {pack_us / batch:>7.2f} us/msg  frame {frame_us / batch:>7.2f} us/msg")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[32, 256, 2048],
+                        help="chat message length in characters")
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 16],
+                        help="events per frame")
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--threshold", type=int, default=0,
+                        help="msgpack compress threshold in bytes (0 never)")
+    args = parser.parse_args()
+    if msgpack is None:
+        parser.error("msgpack is not installed: pip install .[msgpack]")
+    for size in args.sizes:
+        for batch in args.batch:
+            run(size, batch, args.rounds, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Bulk import products for a store from a CSV or NDJSON file.
+
+    python -m scripts.import_products products.ndjson --email seller@example.com
+    python -m scripts.import_products products.csv --email seller@example.com \
+        --archive images.zip
+
+Prints the per-row report as JSON. Images are processed after all rows
+are loaded, in batches.
+"""
+import sys
+import json
+import asyncio
+import argparse
+from pathlib import Path
+from typing import AsyncIterator
+from sqlalchemy import select
+from app.config import base
+from app.models.users import User
+from app.core.db.sessionmanager import sessionmanager
+from app.utils.product_import import (
+    detect_format,
+    import_products,
+    process_import_images,
+)
+
+CHUNK_SIZE = 256 * 1024
+
+
+async def read_chunks(path: Path) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while chunk := await asyncio.to_thread(f.read, CHUNK_SIZE):
+            yield chunk
+
+
+async def main(args: argparse.Namespace) -> int:
+    fmt = detect_format(args.file.name, args.format)
+    async with sessionmanager.session() as db:
+        result = await db.execute(select(User.id).where(User.email == args.email))
+        user_id = result.scalar_one_or_none()
+        if user_id is None:
+            print(f"No user with email {args.email}", file=sys.stderr)
+            return 1
+
+        report = await import_products(
+            db=db,
+            user_id=user_id,
+            chunks=read_chunks(args.file),
+            fmt=fmt,
+            batch_size=args.batch_size,
+        )
+        output = report.as_dict()
+        if report.images and not args.skip_images:
+            output["images_failed"] = await process_import_images(
+                db, report.images, args.archive
+            )
+    await sessionmanager.close()
+
+    print(json.dumps(output, indent=2, default=str))
+    return 0 if report.failed == 0 else 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("file", type=Path)
+    parser.add_argument("--email", required=True, help="owner of the products")
+    parser.add_argument("--format", choices=("csv", "ndjson"))
+    parser.add_argument("--archive", type=Path, help="zip with the images")
+    parser.add_argument("--batch-size", type=int, default=base.PRODUCT_IMPORT_BATCH_SIZE)
+    parser.add_argument("--skip-images", action="store_true")
+    sys.exit(asyncio.run(main(parser.parse_args())))
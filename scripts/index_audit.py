@@ -0,0 +1,24 @@
+"""
+Report foreign keys without an index.
+
+    python -m scripts.index_audit
+
+Exits with status 1 when anything is found, so it can gate CI.
+"""
+import sys
+from app.core.db.model import Base
+from app.core.db.audit import audit_metadata
+from app.models import models_collection  # noqa: F401  (registers tables)
+
+
+def main() -> int:
+    findings = audit_metadata(Base.metadata)
+    for finding in findings:
+        print(finding)
+    if not findings:
+        print(f"OK: {len(Base.metadata.tables)} tables, no missing indexes")
+    return 1 if findings else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
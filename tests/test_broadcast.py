@@ -0,0 +1,203 @@
+import json
+import asyncio
+import pytest
+from app.core import ws
+from app.core.ws import (
+    DISCONNECT,
+    DROP_NEWEST,
+    DROP_OLDEST,
+    GAP_FRAME,
+    Broadcast,
+    Event,
+    PubSubShard,
+    RedisBackend,
+    RedisStreamsBackend,
+    Unsubscribed,
+)
+
+
+def test_patterns_refused_by_streams_backend():
+    with pytest.raises(ValueError, match="pattern"):
+        Broadcast("redis+streams://localhost:6379/0", patterns=True)
+
+
+def test_psubscribe_needs_patterns_enabled():
+    async def run():
+        broadcast = Broadcast("memory://")
+        async with broadcast:
+            with pytest.raises(RuntimeError):
+                async with broadcast.psubscribe("chat:*"):
+                    pass
+
+    asyncio.run(run())
+
+
+def test_truncated_replay_starts_with_gap_frame():
+    history = [Event("room:a", f"m{i}", id=f"{i}-0") for i in range(1, 6)]
+
+    async def read_since(channel, last_id, count):
+        return history[-count:], True
+
+    async def run():
+        broadcast = Broadcast("memory://")
+        broadcast._backend.read_since = read_since
+        async with broadcast:
+            async with broadcast.subscribe("room:a", "0-0", replay_max=2) as sub:
+                return [await sub.get() for _ in range(3)]
+
+    gap, *replayed = asyncio.run(run())
+    assert json.loads(gap.message) == {"type": "gap"}
+    assert gap.message == GAP_FRAME
+    assert [e.message for e in replayed] == ["m4", "m5"]
+
+
+def test_sharded_pubsub_has_no_patterns():
+    assert not RedisBackend("redis://localhost:6379/0", sharded=True).supports_patterns
+    assert RedisBackend("redis://localhost:6379/0", sharded=False).supports_patterns
+
+
+class FlakyPubSub:
+    """Fails the first read, then delivers one message and idles."""
+
+    def __init__(self) -> None:
+        self.connection = None
+        self.reads = 0
+
+    async def get_message(self, timeout=None):
+        self.reads += 1
+        if self.reads == 1:
+            raise ConnectionError("connection reset")
+        if self.reads == 2:
+            return {"type": "message", "channel": b"room:a", "data": b"hi"}
+        await asyncio.Future()
+
+
+def test_shard_reader_survives_connection_errors(monkeypatch):
+    monkeypatch.setattr(ws, "SHARD_RETRY_BASE", 0.01)
+    delivered = []
+
+    async def deliver(event):
+        delivered.append(event)
+
+    async def run():
+        shard = PubSubShard(FlakyPubSub(), deliver)
+        task = asyncio.create_task(shard._read())
+        for _ in range(100):
+            if delivered:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(run())
+    assert [(e.channel, e.message) for e in delivered] == [("room:a", "hi")]
+
+
+class SlowSubscribeBackend(ws.MemoryBackend):
+    def __init__(self) -> None:
+        super().__init__()
+        self.subscribes = 0
+
+    async def subscribe(self, channel: str) -> None:
+        self.subscribes += 1
+        await asyncio.sleep(0.01)
+        await super().subscribe(channel)
+
+
+def test_concurrent_first_subscribers_share_one_subscription():
+    async def run():
+        broadcast = Broadcast("memory://")
+        backend = broadcast._backend = SlowSubscribeBackend()
+        subscribed = asyncio.Barrier(3)
+
+        async def listen():
+            async with broadcast.subscribe("room:a") as sub:
+                await subscribed.wait()
+                return (await sub.get()).message
+
+        async with broadcast:
+            listeners = [asyncio.create_task(listen()) for _ in range(2)]
+            await subscribed.wait()
+            await broadcast.publish("room:a", "hello")
+            received = await asyncio.wait_for(asyncio.gather(*listeners), 1)
+        return backend.subscribes, received
+
+    subscribes, received = asyncio.run(run())
+    assert subscribes == 1
+    assert received == ["hello", "hello"]
+
+
+async def settle():
+    # Lets the memory backend's listener fan out what was published
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+async def overflow(policy):
+    broadcast = Broadcast("memory://", queue_size=2, overflow_policy=policy)
+    async with broadcast:
+        async with broadcast.subscribe("room:a") as sub:
+            for i in range(3):
+                await broadcast.publish("room:a", f"m{i}")
+            await settle()
+            received = []
+            try:
+                while len(received) < 3:
+                    received.append((await asyncio.wait_for(sub.get(), 0.05)).message)
+            except (Unsubscribed, asyncio.TimeoutError):
+                pass
+        return received, broadcast.channels, sorted(broadcast._backend._channels)
+
+
+def test_drop_oldest_keeps_the_newest_events():
+    received, _, _ = asyncio.run(overflow(DROP_OLDEST))
+    assert received == ["m1", "m2"]
+
+
+def test_drop_newest_keeps_the_oldest_events():
+    received, _, _ = asyncio.run(overflow(DROP_NEWEST))
+    assert received == ["m0", "m1"]
+
+
+def test_evicted_last_subscriber_releases_the_channel():
+    received, channels, backend_channels = asyncio.run(overflow(DISCONNECT))
+    assert received == []
+    assert channels == []
+    assert backend_channels == []
+
+
+class FlakyStreamReader:
+    """Fails the first XREAD, then returns one entry and idles."""
+
+    def __init__(self) -> None:
+        self.calls = []
+        self.connection_pool = self
+
+    async def disconnect(self) -> None:
+        pass
+
+    async def xread(self, streams, count=None, block=None):
+        self.calls.append(dict(streams))
+        if len(self.calls) == 1:
+            raise ConnectionError("connection reset")
+        if len(self.calls) == 2:
+            return [(b"room:a", [(b"5-0", {b"data": b"hi"})])]
+        await asyncio.Future()
+
+
+def test_stream_reader_resumes_after_connection_errors(monkeypatch):
+    monkeypatch.setattr(ws, "SHARD_RETRY_BASE", 0.01)
+
+    async def run():
+        backend = RedisStreamsBackend("redis://localhost:6379/0")
+        reader = backend._reader = FlakyStreamReader()
+        backend._streams["room:a"] = "4-0"
+        backend._ready.set()
+        task = asyncio.create_task(backend._stream_listener())
+        event = await asyncio.wait_for(backend.next_published(), 1)
+        task.cancel()
+        return reader.calls, event, backend._streams
+
+    calls, event, streams = asyncio.run(run())
+    assert calls[:2] == [{"room:a": "4-0"}, {"room:a": "4-0"}]
+    assert (event.channel, event.message, event.id) == ("room:a", "hi", "5-0")
+    assert streams == {"room:a": "5-0"}
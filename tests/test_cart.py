@@ -0,0 +1,35 @@
+import asyncio
+from sqlalchemy.exc import OperationalError
+from app.utils import cart as module
+from app.utils.cart import DIRTY_KEY, CartStore
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.sets: dict[str, set] = {}
+
+    def register_script(self, script):
+        return None
+
+    async def spop(self, key, count):
+        members = self.sets.get(key, set())
+        popped = [members.pop() for _ in range(min(count, len(members)))]
+        return [str(m).encode() for m in popped]
+
+    async def sadd(self, key, *values):
+        self.sets.setdefault(key, set()).update(int(v) for v in values)
+
+
+def test_failed_flush_puts_users_back_on_dirty_set(monkeypatch):
+    async def db_down(*args, **kwargs):
+        raise OperationalError("INSERT", {}, ConnectionRefusedError())
+
+    monkeypatch.setattr(module.Carts, "upsert", db_down)
+    flushed = dict(module.cart_flushed._values)
+    conn = FakeRedis()
+    conn.sets[DIRTY_KEY] = {1, 2, 3}
+
+    asyncio.run(CartStore(conn, batch_size=10).flush())
+
+    assert conn.sets[DIRTY_KEY] == {1, 2, 3}
+    assert module.cart_flushed._values == flushed
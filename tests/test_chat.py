@@ -0,0 +1,99 @@
+import uuid
+from contextlib import asynccontextmanager
+import pytest
+from fastapi import FastAPI, WebSocketDisconnect
+from fastapi.testclient import TestClient
+from app.core.ws import Broadcast, ProtectedWebSocket
+from app.routes.ws import chat as module
+
+USER = str(uuid.uuid4())
+
+
+class SignedIn(ProtectedWebSocket):
+    def __init__(self, ws):
+        super().__init__(ws, mode="none")
+        self._user = USER
+
+
+class UserBucket:
+    """Grants the listed takes (1-based) only."""
+
+    def __init__(self, granted: set[int]) -> None:
+        self.granted = granted
+        self.takes = 0
+
+    async def take(self, key, n=1):
+        self.takes += 1
+        return self.takes in self.granted
+
+
+def hang_up(ws) -> int:
+    """
+    Have the server end the session (an invalid frame does) and wait
+    for its close, so the app is done before the client goes away.
+    Returns the close code.
+    """
+    ws.send_json({"type": "bye"})
+    with pytest.raises(WebSocketDisconnect) as closed:
+        while True:
+            ws.receive_json()
+    return closed.value.code
+
+
+@asynccontextmanager
+async def lifespan(app):
+    async with module.broadcaster:
+        yield
+
+
+def chat_app(monkeypatch) -> FastAPI:
+    # A broadcaster of its own: its queues belong to this test's loop
+    monkeypatch.setattr(module, "broadcaster", Broadcast("memory://"))
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(module.chat_routes)
+    return app
+
+
+def test_flood_drops_messages_with_one_notice_and_keeps_connection_tokens(monkeypatch):
+    monkeypatch.setattr(module, "ProtectedWebSocket", SignedIn)
+    monkeypatch.setattr(module.base, "CHAT_HISTORY_ENABLED", False)
+    monkeypatch.setattr(module.base, "WS_FLOOD_POLICY", module.FLOOD_DROP)
+    monkeypatch.setattr(module.base, "WS_RATE_PER_SECOND", 0.001)
+    monkeypatch.setattr(module.base, "WS_RATE_BURST", 2)
+    # The user's bucket refuses messages 2-4; had those drawn from the
+    # connection's two tokens, message 5 would be refused too
+    monkeypatch.setattr(module, "user_buckets", UserBucket({1, 5}))
+
+    with TestClient(chat_app(monkeypatch)) as client:
+        with client.websocket_connect("/chat/") as ws:
+            for i in range(1, 6):
+                ws.send_json({"type": "message", "message": f"m{i}"})
+            frames = []
+            while len(frames) < 3:
+                frame = ws.receive_json()
+                # Events come in batches (arrays), control frames alone
+                frames += frame if isinstance(frame, list) else [frame]
+            hang_up(ws)
+
+    errors = [f for f in frames if f.get("type") == "error"]
+    assert len(errors) == 1
+    assert errors[0]["payload"]["code"] == 429
+    messages = [f for f in frames if f.get("type") == "message"]
+    assert [m["message"] for m in messages] == ["m1", "m5"]
+
+
+def test_flood_disconnect_policy_closes_the_socket(monkeypatch):
+    monkeypatch.setattr(module.base, "CHAT_HISTORY_ENABLED", False)
+    monkeypatch.setattr(module.base, "WS_FLOOD_POLICY", module.FLOOD_DISCONNECT)
+    monkeypatch.setattr(module.base, "WS_RATE_PER_SECOND", 0.001)
+    monkeypatch.setattr(module.base, "WS_RATE_BURST", 1)
+
+    with TestClient(chat_app(monkeypatch)) as client:
+        with client.websocket_connect("/chat/") as ws:
+            ws.send_json({"type": "message", "message": "ok"})
+            ws.send_json({"type": "message", "message": "flood"})
+            with pytest.raises(WebSocketDisconnect) as closed:
+                while True:
+                    ws.receive_json()
+
+    assert closed.value.code == module.CLOSE_POLICY_VIOLATION
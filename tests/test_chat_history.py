@@ -0,0 +1,69 @@
+import uuid
+import asyncio
+from datetime import datetime, timezone
+from sqlalchemy.exc import DataError, OperationalError
+from app.utils import chat_history as module
+from app.utils.chat_history import DEAD_KEY, RETRY_KEY, ChatHistoryBuffer, _load
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.lists: dict[str, list] = {}
+
+    async def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(values)
+        return len(self.lists[key])
+
+
+def message(text: str) -> dict:
+    return {
+        "uuid": uuid.uuid4(),
+        "room": "lobby",
+        "user_uuid": None,
+        "message": text,
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
+def test_failed_insert_is_parked_for_retry(monkeypatch):
+    async def db_down(*args, **kwargs):
+        raise OperationalError("INSERT", {}, ConnectionRefusedError())
+
+    monkeypatch.setattr(module.ChatMessages, "upsert", db_down)
+    written = dict(module.chat_history_written._values)
+    conn = FakeRedis()
+    buffer = ChatHistoryBuffer(conn, batch_size=10)
+    rows = [message("one"), message("two")]
+    for row in rows:
+        buffer.add(row)
+
+    asyncio.run(buffer.flush())
+
+    parked = [_load(raw) for raw in conn.lists[RETRY_KEY]]
+    assert [r["uuid"] for r in parked] == [r["uuid"] for r in rows]
+    assert [r["message"] for r in parked] == ["one", "two"]
+    assert module.chat_history_written._values == written
+    assert len(buffer) == 0
+
+
+def test_rejected_rows_are_dead_lettered_and_the_rest_written(monkeypatch):
+    inserted = []
+
+    async def insert(db, rows, *args, **kwargs):
+        if any("\x00" in row["message"] for row in rows):
+            raise DataError("INSERT", {}, ValueError("invalid byte sequence"))
+        inserted.extend(rows)
+
+    monkeypatch.setattr(module.ChatMessages, "upsert", insert)
+    conn = FakeRedis()
+    buffer = ChatHistoryBuffer(conn, batch_size=10)
+    rows = [message(text) for text in ("a", "b", "bad\x00", "c", "d")]
+    for row in rows:
+        buffer.add(row)
+
+    asyncio.run(buffer.flush())
+
+    assert [r["message"] for r in inserted] == ["a", "b", "c", "d"]
+    dead = [_load(raw) for raw in conn.lists[DEAD_KEY]]
+    assert [r["message"] for r in dead] == ["bad\x00"]
+    assert RETRY_KEY not in conn.lists
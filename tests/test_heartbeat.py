@@ -0,0 +1,46 @@
+import asyncio
+import pytest
+from fastapi import WebSocketDisconnect
+from starlette.websockets import WebSocketState
+from app.core.ws import PING_FRAME, SocketRegistry
+
+
+class SilentSocket:
+    """Answers protocol pings (invisible here) but never app pings."""
+
+    application_state = WebSocketState.CONNECTED
+
+    def __init__(self) -> None:
+        self.sent = []
+        self.closed = None
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+    async def close(self, code, reason=None):
+        self.closed = code
+        self.application_state = WebSocketState.DISCONNECTED
+
+
+async def beat(ws, require_pong: bool) -> None:
+    sockets = SocketRegistry()
+    with sockets.track(ws):
+        await asyncio.wait_for(
+            sockets.heartbeat(
+                ws, interval=0.01, idle_timeout=0.02, require_pong=require_pong
+            ),
+            0.2,
+        )
+
+
+def test_silent_socket_is_kept_unless_app_pongs_are_required():
+    kept = SilentSocket()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(beat(kept, require_pong=False))
+    assert kept.closed is None
+    assert len(kept.sent) > 2 and set(kept.sent) == {PING_FRAME}
+
+    evicted = SilentSocket()
+    with pytest.raises(WebSocketDisconnect):
+        asyncio.run(beat(evicted, require_pong=True))
+    assert evicted.closed == 1000
@@ -0,0 +1,50 @@
+import asyncio
+from sqlalchemy.dialects import postgresql
+from app.managers.base import MAX_BIND_PARAMS
+from app.managers.chat import ChatMessages
+
+
+class RecordingSession:
+    def __init__(self) -> None:
+        self.statements = []
+
+    async def scalars(self, stmt, *args, **kwargs):
+        self.statements.append(stmt.compile(dialect=postgresql.dialect()))
+        return self
+
+    def all(self):
+        return []
+
+
+def test_upsert_splits_rows_below_the_bind_parameter_limit():
+    rows = [{"room": "lobby", "message": str(i)} for i in range(20_000)]
+    db = RecordingSession()
+
+    asyncio.run(ChatMessages.upsert(db, rows, ["uuid"], update_columns=[]))
+
+    assert len(db.statements) > 1
+    assert all(len(c.params) <= MAX_BIND_PARAMS for c in db.statements)
+    assert sum(len(c.params) for c in db.statements) >= 2 * len(rows)
+
+
+class PlanningSession:
+    def __init__(self) -> None:
+        self.sql = []
+
+    async def execute(self, stmt, *args, **kwargs):
+        self.sql.append(str(stmt))
+        return self
+
+    def scalar(self):
+        return '[{"Plan": {"Node Type": "Seq Scan", "Plan Rows": 1234}}]'
+
+
+def test_cold_count_estimates_live_rows_without_counting():
+    db = PlanningSession()
+
+    assert asyncio.run(ChatMessages.approx_count(db)) == 1234
+
+    assert db.sql == [
+        "EXPLAIN (FORMAT JSON) SELECT 1 FROM chat_messages"
+        " WHERE deleted_at IS NULL"
+    ]
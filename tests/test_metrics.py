@@ -0,0 +1,26 @@
+import json
+from app.core import metrics as module
+from app.core.metrics import Registry, read_snapshots
+
+
+def worker_registry(requests: int, in_progress: int, latency: float) -> Registry:
+    registry = Registry()
+    registry.counter("requests_total", "Requests.", ["route"]).inc(requests, route="/a")
+    registry.gauge("in_progress", "In progress.").set(in_progress)
+    registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1)).observe(latency)
+    return registry
+
+
+def test_render_sums_workers_and_drops_gauges_of_exited_ones(tmp_path, monkeypatch):
+    (tmp_path / "101.json").write_text(json.dumps(worker_registry(3, 2, 0.05).snapshot()))
+    (tmp_path / "102.json").write_text(json.dumps(worker_registry(4, 5, 0.5).snapshot()))
+    monkeypatch.setattr(module, "_alive", lambda pid: pid == 101)
+
+    text = worker_registry(0, 0, 0).render(read_snapshots(str(tmp_path)))
+
+    assert 'requests_total{route="/a"} 7' in text
+    # The exited worker's in-flight requests are gone with it
+    assert "in_progress 2" in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert "latency_seconds_count 2" in text
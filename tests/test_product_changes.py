@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta, timezone
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.db.sessionmanager import get_session
+from app.routes.http.store import products as module
+from app.utils.sync import decode_cursor, encode_cursor
+
+WATERMARK = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+class Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalar_one(self):
+        return self.rows[0]
+
+    def all(self):
+        return self.rows
+
+
+class NothingChanged:
+    """A session for a feed with no changes since the cursor."""
+
+    def __init__(self) -> None:
+        self.queries = 0
+
+    async def execute(self, stmt, params=None):
+        self.queries += 1
+        if stmt is module.FEED_WATERMARK:
+            return Result([WATERMARK])
+        return Result([])
+
+    async def scalars(self, stmt):
+        self.queries += 1
+        return []
+
+
+def feed(session) -> TestClient:
+    app = FastAPI()
+    app.include_router(module.store_routes)
+    app.dependency_overrides[get_session] = lambda: session
+    return TestClient(app)
+
+
+def test_caught_up_client_gets_a_cursor_at_the_watermark():
+    session = NothingChanged()
+    seen = encode_cursor(WATERMARK - timedelta(hours=1), 42)
+
+    body = feed(session).get(
+        "/store/products/changes", params={"cursor": seen}
+    ).json()
+
+    assert body["changes"] == []
+    assert body["has_more"] is False
+    assert decode_cursor(body["next_cursor"]) == (WATERMARK, 0)
+
+
+def test_cursor_older_than_tombstone_retention_is_refused(monkeypatch):
+    monkeypatch.setattr(module.base, "PRODUCT_TOMBSTONE_RETENTION_DAYS", 7)
+    session = NothingChanged()
+    client = feed(session)
+    stale = encode_cursor(datetime.now(timezone.utc) - timedelta(days=8), 1)
+
+    assert client.get(
+        "/store/products/changes", params={"cursor": stale}
+    ).status_code == 410
+    assert client.get(
+        "/store/products/changes", params={"cursor": "not-a-cursor"}
+    ).status_code == 400
+    assert session.queries == 0
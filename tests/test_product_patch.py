@@ -0,0 +1,83 @@
+from io import BytesIO
+from uuid import uuid4
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from PIL import Image
+from app.core.db.sessionmanager import get_session
+from app.dependencies.auth import auth_dependency
+from app.models.users import User
+from app.routes.http.store import products as module
+
+OWNER = User(id=1)
+
+
+class Result:
+    def scalar_one_or_none(self):
+        return None
+
+
+class SomeoneElsesProduct:
+    """The owner-scoped UPDATE matches nothing, but the product exists."""
+
+    def __init__(self) -> None:
+        self.statements = []
+
+    async def execute(self, stmt, params=None):
+        self.statements.append(stmt)
+        return Result()
+
+    async def scalar(self, stmt):
+        self.statements.append(stmt)
+        return 99
+
+
+def signed_in(request: Request):
+    request.state.user = OWNER
+    return OWNER
+
+
+def patch(session, **kwargs):
+    app = FastAPI()
+    app.include_router(module.store_routes)
+    app.dependency_overrides[get_session] = lambda: session
+    app.dependency_overrides[auth_dependency] = signed_in
+    return TestClient(app).patch(f"/store/products/{uuid4()}", **kwargs)
+
+
+def png() -> bytes:
+    out = BytesIO()
+    Image.new("RGB", (4, 4)).save(out, format="PNG")
+    return out.getvalue()
+
+
+def test_malformed_lists_are_rejected_before_touching_the_product():
+    session = SomeoneElsesProduct()
+
+    for data in (
+        {"specs": '{"color": "red"}'},
+        {"specs": '["red", 2]'},
+        {"remove_images": '"not a list"'},
+        {"remove_images": '["not-a-uuid"]'},
+    ):
+        assert patch(session, data=data).status_code == 400, data
+    assert session.statements == []
+
+
+def test_patching_someone_elses_product_is_forbidden_and_keeps_no_files(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setattr(module, "MEDIA_PRODUCTS", tmp_path)
+    session = SomeoneElsesProduct()
+
+    response = patch(
+        session,
+        data={"title": "mine now"},
+        files={"primary_image": ("a.png", png(), "image/png")},
+    )
+
+    assert response.status_code == 403
+    update = str(session.statements[0])
+    assert "products.user_id = " in update
+    assert "products.deleted_at IS NULL" in update
+    # The upload was converted before the UPDATE, then thrown away
+    assert list(tmp_path.iterdir()) == []